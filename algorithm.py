@@ -1,8 +1,12 @@
 from __future__ import annotations
 import sys
-from baruah import baruah, relax_ppd_nce
+from baruah import baruah_all_destinations, baruah_label_setting, relax_ppd_nce
+from forwarding import ForwardingIndex
 from structures import Entry, Node, Edge, Graph, Table, TableDiff
-from typing import Dict, List, Tuple
+from scheduling import FifoScheduler, MessageScheduler
+from tracing import Tracer, TraceLevel
+from wire import encode_diff
+from typing import Dict, Iterable, List, Tuple
 from copy import deepcopy
 
 class Message:
@@ -15,17 +19,68 @@ class Message:
         self.to_node = to_node
         self.changes = changes
 
+class EdgeChangesReport:
+    messages_sent: int
+    messages_delivered: int
+    # messages when the changes are applied one by one, if they were computed
+    sequential_messages_sent: int | None
+    sequential_messages_delivered: int | None
+
+    def __init__(
+        self: EdgeChangesReport, 
+        messages_sent: int, 
+        messages_delivered: int, 
+        sequential_messages_sent: int | None = None, 
+        sequential_messages_delivered: int | None = None
+    ):
+        self.messages_sent = messages_sent
+        self.messages_delivered = messages_delivered
+        self.sequential_messages_sent = sequential_messages_sent
+        self.sequential_messages_delivered = sequential_messages_delivered
+
 class Router:
     system: System
     node: Node
     incoming_edges: List[Edge]
     table: Table
+    # the table relaxed over each incoming edge, keyed by the predecessor, as last sent to it
+    relaxed: Dict[Node, Table]
+    # built by the first lookup, then kept up to date with the changes the router receives
+    forwarding_index: ForwardingIndex | None
 
     def __init__(self: Router, system: System, node: Node, incoming_edges: List[Edge]):
         self.system = system
         self.node = node
         self.incoming_edges = incoming_edges
         self.table = Table()
+        self.relaxed = {edge.from_node: Table() for edge in incoming_edges}
+        self.forwarding_index = None
+
+    def set_table(self: Router, table: Table):
+        """
+        Replaces the table of the router, relaxing it over every incoming edge again.
+        """
+        self.table = table
+        self.relaxed = {edge.from_node: self._relax(edge) for edge in self.incoming_edges}
+        self.forwarding_index = None
+
+    def _relax(self: Router, edge: Edge) -> Table:
+        """
+        Relaxes the entries of the table that can be extended to a predecessor over the `edge`.
+        """
+        result = Table()
+        relax_ppd_nce(edge, result, self.table, self.system.is_considered)
+        return result
+
+    def lookup(self: Router, deadline: int) -> Tuple[Node | None, int, int] | None:
+        """
+        Returns the (next hop, expected time, max time) to forward a packet with the `deadline` along,
+        see `ForwardingIndex.lookup`.
+        """
+        if self.forwarding_index == None:
+            self.forwarding_index = ForwardingIndex(self.table)
+
+        return self.forwarding_index.lookup(deadline)
 
     # def calculate_tables(self: Router):
     #     """
@@ -55,14 +110,11 @@ class Router:
             if original_edge.worst_case_delay != new_edge.worst_case_delay:
                 raise ValueError("worst case delay should not change")
 
-            considered_table = deepcopy(self.table)
-            considered_table.remove_all_entries_with_n_parents(len(self.system.graph.nodes()) - 1)
-            
-            old = Table() 
-            relax_ppd_nce(original_edge, old, considered_table)
+            if original_edge == new_edge:
+                continue
 
-            new = Table()
-            relax_ppd_nce(new_edge, new, considered_table)
+            old = self.relaxed[new_edge.from_node]
+            new = self.relaxed[new_edge.from_node] = self._relax(new_edge)
 
             changes = TableDiff(old, new)
             
@@ -77,102 +129,370 @@ class Router:
     def send(self: Router, message: Message):
         """
         This method simulates the router receiving a message about changes. 
+
+        Only the entries of the table that can be extended to a predecessor are relaxed. The
+        considered entries the message adds are relaxed into the previous relaxed table of every
+        incoming edge. The table is relaxed again if the smallest max time of the considered
+        entries changed, or if the message removes an entry whose relaxed entry was sent.
         """
         to_send = []
+        is_considered = self.system.is_considered
 
-        considered_table = deepcopy(self.table)
-        considered_table.remove_all_entries_with_n_parents(len(self.system.graph.nodes()) - 1)
+        # the considered entries the changes actually remove and add
+        removed = [entry for entry in message.changes.removed if is_considered(entry) and entry in self.table]
+        added = [entry for entry in message.changes.added if is_considered(entry) and entry not in self.table]
+        min_max_time = self.table.min_max_time(is_considered)
 
-        new_table = deepcopy(self.table)
+        new_table = self.table.copy()
         message.changes.apply(new_table)
+        if self.forwarding_index != None:
+            self.forwarding_index.apply(message.changes)
+
+        old_table = self.table
+        self.table = new_table
+
+        # the relaxed tables do not change if no considered entry changed
+        incoming_edges = self.incoming_edges
+        if len(removed) == 0 and len(added) == 0:
+            incoming_edges = []
 
-        new_considered_table = deepcopy(new_table)
-        new_considered_table.remove_all_entries_with_n_parents(len(self.system.graph.nodes()) - 1)
+        relax_all = min_max_time != new_table.min_max_time(is_considered)
 
-        for edge in self.incoming_edges:
-            old = Table()
-            relax_ppd_nce(edge, old, considered_table)
+        for edge in incoming_edges:
+            old = self.relaxed[edge.from_node]
 
-            new = Table()
-            relax_ppd_nce(edge, new, new_considered_table)
+            if relax_all or any(
+                edge.from_node not in entry.parents and _relaxed_entry(edge, min_max_time, entry) in old
+                for entry in removed
+            ):
+                new = self._relax(edge)
+            else:
+                new = old.copy()
+                for entry in added:
+                    if edge.from_node not in entry.parents:
+                        new.insert_ppd(_relaxed_entry(edge, min_max_time, entry))
 
+            self.relaxed[edge.from_node] = new
             changes = TableDiff(old, new)
-            self.system.logs.append(f"[ROUTER {self.node}] evaluating changes for edge ({edge})")
-            self.system.logs.append(f"[ROUTER {self.node}] old table {self.table} new table {new_table}")
-            self.system.logs.append(f"[ROUTER {self.node}] old considered table {considered_table} new considered table {new_considered_table}")
-            self.system.logs.append(f"[ROUTER {self.node}] old {old} new {new} changes {changes}")
+
+            tracer = self.system.tracer
+            if TraceLevel.DEBUG <= tracer.level:
+                tracer.trace(TraceLevel.DEBUG, "ROUTER", self.node, "evaluating changes for edge ({})", edge)
+                tracer.trace(TraceLevel.DEBUG, "ROUTER", self.node, "old table {} new table {}", old_table, new_table)
+                tracer.trace(TraceLevel.DEBUG, "ROUTER", self.node, "old {} new {} changes {}", old, new, changes)
 
             if 0 < len(changes):
                 to_send.append(Message(self.node, edge.from_node, changes))
-        
-        self.table = new_table
 
         for message in to_send:
             self.system.send(message)
 
+def _relaxed_entry(edge: Edge, min_max_time: int, entry: Entry) -> Entry:
+    """
+    Returns the entry `relax_ppd_nce` derives from an `entry` of the table of the to node of the `edge`,
+    `min_max_time` is the smallest max time of the entries relaxed.
+    """
+    max_time = max(edge.worst_case_delay + min_max_time, entry.max_time + edge.expected_delay)
+    expected_time = entry.expected_time + edge.expected_delay
+    return Entry(max_time, entry.parents.prepend(edge.to_node, edge.bits), expected_time)
+
 class System:
     graph: Graph
     destination: Node
     routers: Dict[Node, Router]
-    logs: List[str]
-    messages: List[Message]
+    tracer: Tracer
+    messages: MessageScheduler
+    pending_messages: Dict[Node, Message]
+    coalesce_messages: bool
     processing_messages: bool
     messages_sent: int
+    messages_delivered: int
+    count_bytes: bool
+    # encoded size of the changes of the messages sent, only counted if `count_bytes` is set
+    bytes_sent: int
+    path_length_limit: int
+
+    def __init__(
+        self: System, 
+        graph: Graph, 
+        destination: Node, 
+        tracer: Tracer | None = None, 
+        coalesce_messages: bool = False,
+        scheduler: MessageScheduler | None = None,
+        count_bytes: bool = False,
+        tables: Dict[Node, Table] | None = None
+    ):
+        """
+        Constructs a new system of routers for the `graph` and calculates the initial tables.
+
+        If `coalesce_messages` is set, a message sent to a router that already has a message waiting 
+        in the queue is merged into the waiting message instead of being queued separately.
+
+        The `scheduler` decides the order in which messages are delivered, by default the order
+        they were sent in.
+
+        If `count_bytes` is set, the changes of every message sent are encoded with `encode_diff`
+        and their sizes are added up in `bytes_sent`.
 
-    def __init__(self: System, graph: Graph, destination: Node):
+        If `tables` are provided (for example by `baruah_label_setting`) the routers start with them
+        instead of calculating their tables by exchanging messages.
+        """
         self.graph = graph
         self.destination = destination
+
+        # entries with this many parents already visit every other node, 
+        # they can not be extended to a predecessor without creating a cycle
+        self.path_length_limit = len(graph.nodes()) - 1
         
         self.routers = {}
         for node in graph.nodes():
             incoming_edges = graph.incoming_edges(node)
             self.routers[node] = Router(self, node, incoming_edges)
 
-        self.messages = []
+        if scheduler == None:
+            scheduler = FifoScheduler()
+        self.messages = scheduler
+        self.pending_messages = {}
+        self.coalesce_messages = coalesce_messages
         self.processing_messages = False
 
-        self.logs = []
+        if tracer == None:
+            tracer = Tracer()
+        self.tracer = tracer
         self.messages_sent = 0
+        self.messages_delivered = 0
+        self.count_bytes = count_bytes
+        self.bytes_sent = 0
         
+        if tables != None:
+            for (node, table) in tables.items():
+                self.routers[node].set_table(table)
+            return
+
         diff = TableDiff(Table(), Table(set([Entry(0, [], 0)])))
         self.send(Message(None, destination, diff))
 
-    def send(self: System, message: Message):
-        self.logs.append(f"[SYSTEM] message from {message.from_node} to {message.to_node} with content {message.changes}")
-        self.messages.append(message)
+    @property
+    def logs(self: System) -> List[str]:
+        """
+        The formatted events kept by the tracer of the system.
+        """
+        return self.tracer.lines()
 
+    def send(self: System, message: Message):
+        if TraceLevel.INFO <= self.tracer.level:
+            self.tracer.trace(
+                TraceLevel.INFO, "SYSTEM", None, "message from {} to {} with content {}", 
+                message.from_node, message.to_node, message.changes
+            )
         self.messages_sent += 1
+        if self.count_bytes:
+            self.bytes_sent += len(encode_diff(message.changes))
+
+        if self.coalesce_messages:
+            pending_message = self.pending_messages.get(message.to_node)
+            if pending_message != None:
+                if pending_message.from_node != message.from_node:
+                    pending_message.from_node = None
+                pending_message.changes = pending_message.changes.followed_by(message.changes)
+            else:
+                self.pending_messages[message.to_node] = message
+                self.messages.push(message)
+        else:
+            self.messages.push(message)
 
         if not self.processing_messages:
             self.proccess_messages()
 
+    def is_considered(self: System, entry: Entry) -> bool:
+        """
+        Checks whether a router should relax the `entry` towards its predecessors.
+        """
+        return len(entry.parents) != self.path_length_limit
+
     def proccess_messages(self: System):
         self.processing_messages = True
        
-        while self.messages:
-            message = self.messages.pop(0)
+        while 0 < len(self.messages):
+            message = self.messages.pop()
+            if self.coalesce_messages:
+                del self.pending_messages[message.to_node]
+
+            self.messages_delivered += 1
             self.routers[message.to_node].send(message)
 
         self.processing_messages = False
 
     def simulate_edge_change(self: System, edge: Tuple[Node, Node], new_expected_delay: int):
         self.messages_sent = 0
+        self.messages_delivered = 0
+        self.bytes_sent = 0
         (u, v) = edge
         self.graph.modify_edge_weights(u, v, new_expected_delay=new_expected_delay)
         self.routers[v].update_incoming_edges(self.graph.incoming_edges(v))
 
+    def simulate_edge_changes(
+        self: System, 
+        changes: List[Tuple[Tuple[Node, Node], int]], 
+        compare_sequential: bool = False
+    ) -> EdgeChangesReport:
+        """
+        Applies several edge changes `((u, v), new_expected_delay)` at once, every affected router 
+        detects the changes of all its incoming edges together and the resulting messages are only 
+        processed after all routers were updated.
+
+        If `compare_sequential` is set, the changes are also applied one by one with 
+        `simulate_edge_change` to a copy of the system to report the messages that would take.
+        """
+        # nothing is modified unless every change is valid
+        for ((u, v), _) in changes:
+            if u not in self.graph.data or v not in self.graph.data[u]:
+                raise ValueError(f"there is no edge ({u}, {v}) in the graph")
+
+        report = EdgeChangesReport(0, 0)
+        if compare_sequential:
+            sequential = deepcopy(self, {id(self.tracer): Tracer()})
+            report.sequential_messages_sent = 0
+            report.sequential_messages_delivered = 0
+            for (edge, new_expected_delay) in changes:
+                sequential.simulate_edge_change(edge, new_expected_delay)
+                report.sequential_messages_sent += sequential.messages_sent
+                report.sequential_messages_delivered += sequential.messages_delivered
+
+        self.messages_sent = 0
+        self.messages_delivered = 0
+        self.bytes_sent = 0
+
+        affected_routers: List[Node] = []
+        for ((u, v), new_expected_delay) in changes:
+            self.graph.modify_edge_weights(u, v, new_expected_delay=new_expected_delay)
+            if v not in affected_routers:
+                affected_routers.append(v)
+
+        self.processing_messages = True
+        try:
+            for v in affected_routers:
+                self.routers[v].update_incoming_edges(self.graph.incoming_edges(v))
+        finally:
+            self.processing_messages = False
+
+        self.proccess_messages()
+
+        report.messages_sent = self.messages_sent
+        report.messages_delivered = self.messages_delivered
+
+        return report
+
     def recalculate_tables(self):
         """
         Simulates the case when the graph view is distributed to every router in the network
         and routing tables are recalculated based on the uniform graph view. 
+
+        The tables are the fixed point of `relax_ppd_nce` (see `baruah_label_setting`), the state the
+        routers converge to, at every graph size. `baruah` stops after V - 1 passes and may not reach it.
         """
-        tables = baruah(self.graph, self.destination, relax_ppd_nce)
+        tables = baruah_label_setting(self.graph, self.destination, relax_ppd_nce)
         for (node, table) in tables.items():
-            self.routers[node].table = table
+            self.routers[node].set_table(table)
 
     def tables(self) -> Dict[Node, Table]:
         result = {}
         for (node, router) in self.routers.items():
-            result[node] = deepcopy(router.table)
+            result[node] = router.table.copy()
 
         return result
+
+class MultiDestinationRouter:
+    """
+    A router of a `MultiDestinationSystem`, it has a table for every destination of the system.
+    """
+    system: MultiDestinationSystem
+    node: Node
+
+    def __init__(self: MultiDestinationRouter, system: MultiDestinationSystem, node: Node):
+        self.system = system
+        self.node = node
+
+    def table(self: MultiDestinationRouter, destination: Node) -> Table:
+        return self.system.systems[destination].routers[self.node].table
+
+    @property
+    def tables(self: MultiDestinationRouter) -> Dict[Node, Table]:
+        """
+        The tables of the router keyed by destination.
+        """
+        return {destination: self.table(destination) for destination in self.system.destinations}
+
+class MultiDestinationSystem:
+    """
+    Routers with tables towards several destinations (every node by default).
+
+    Every destination is handled by its own `System` over the shared `graph`, 
+    the routers of this system combine the tables of the routers of these systems.
+
+    The initial tables of all destinations are computed with one `baruah_all_destinations` call
+    instead of every system exchanging messages to calculate them.
+    """
+    graph: Graph
+    destinations: List[Node]
+    systems: Dict[Node, System]
+    routers: Dict[Node, MultiDestinationRouter]
+
+    def __init__(
+        self: MultiDestinationSystem, 
+        graph: Graph, 
+        destinations: Iterable[Node] | None = None, 
+        tracer: Tracer | None = None, 
+        coalesce_messages: bool = False
+    ):
+        self.graph = graph
+
+        if destinations == None:
+            destinations = graph.nodes()
+        self.destinations = list(destinations)
+
+        all_tables = baruah_all_destinations(graph, relax_ppd_nce, self.destinations)
+
+        self.systems = {}
+        for destination in self.destinations:
+            self.systems[destination] = System(
+                graph, destination, tracer, coalesce_messages, tables=all_tables[destination]
+            )
+
+        self.routers = {}
+        for node in graph.nodes():
+            self.routers[node] = MultiDestinationRouter(self, node)
+
+    @property
+    def messages_sent(self: MultiDestinationSystem) -> int:
+        return sum(system.messages_sent for system in self.systems.values())
+
+    @property
+    def messages_delivered(self: MultiDestinationSystem) -> int:
+        return sum(system.messages_delivered for system in self.systems.values())
+
+    def simulate_edge_change(self: MultiDestinationSystem, edge: Tuple[Node, Node], new_expected_delay: int):
+        (u, v) = edge
+        self.graph.modify_edge_weights(u, v, new_expected_delay=new_expected_delay)
+
+        incoming_edges = self.graph.incoming_edges(v)
+        for system in self.systems.values():
+            system.messages_sent = 0
+            system.messages_delivered = 0
+            system.routers[v].update_incoming_edges(incoming_edges)
+
+    def recalculate_tables(self: MultiDestinationSystem):
+        """
+        Recalculates the tables of every destination in one pass over the graph.
+        """
+        all_tables = baruah_all_destinations(self.graph, relax_ppd_nce, self.destinations)
+        for (destination, tables) in all_tables.items():
+            system = self.systems[destination]
+            for (node, table) in tables.items():
+                system.routers[node].set_table(table)
+
+    def tables(self: MultiDestinationSystem) -> Dict[Node, Dict[Node, Table]]:
+        """
+        The tables of every destination, keyed by destination and then by node.
+        """
+        return {destination: system.tables() for (destination, system) in self.systems.items()}
@@ -1,14 +1,21 @@
 from __future__ import annotations
 from algorithm import System
-from structures import Node, Graph
+from tracing import Tracer, TraceLevel
+from structures import Node, Graph, TableDiff
 from typing import Tuple, List
 from copy import deepcopy
 from dataclasses import dataclass
 from util import draw_graph
-from baruah import baruah, relax_original, apply_strict_domination_to_tables, relax_ppd_nce
+from baruah import baruah, baruah_label_setting, relax_original, apply_strict_domination_to_tables, relax_ppd_nce
+from simulation import ConvergenceSimulator
+from sharding import ShardedSystem
+from wire import decode_diff, encode_diff
 from math import inf
 import random
 
+# number of trace events kept for printing the system logs of a failed test
+TRACE_CAPACITY = 100000
+
 class TestResult:
     passed: bool
     message_count: int
@@ -20,7 +27,7 @@ class TestResult:
 def test_algorithm2(graph: Graph, destination: Node, edge: Tuple[Node, Node], new_expected_delay: int) -> TestResult:
     original_graph = deepcopy(graph)
 
-    system = System(graph, destination)
+    system = System(graph, destination, Tracer(TraceLevel.DEBUG, TRACE_CAPACITY))
     system.simulate_edge_change(edge, new_expected_delay)
         
     message_count = system.messages_sent 
@@ -113,7 +120,7 @@ def test_algorithm2(graph: Graph, destination: Node, edge: Tuple[Node, Node], ne
 def test_algorithm(graph: Graph, destination: Node, edge: Tuple[Node, Node], new_expected_delay: int) -> bool:
     original_graph = deepcopy(graph)
 
-    system = System(graph, destination)
+    system = System(graph, destination, Tracer(TraceLevel.DEBUG, TRACE_CAPACITY))
 
     system.simulate_edge_change(edge, new_expected_delay)
     actual_tables = system.tables()
@@ -264,6 +271,173 @@ def random_test(
 
     print(f"{passed} passed out of {num_tests}")
 
+def random_change(graph: Graph) -> Tuple[Tuple[Node, Node], int]:
+    edge = random.choice(list(graph.edges()))
+    return ((edge.from_node, edge.to_node), random.randint(0, edge.worst_case_delay))
+
+def wire_test(create_info: RandomGraphCreateInfo, num_tests: int = 200):
+    """
+    Encodes the diff between the tables of every router before and after an edge change and checks
+    that decoding it for the old table gives back the same diff.
+    """
+    print("WIRE TEST")
+    print()
+
+    failed = 0
+    for _ in range(num_tests):
+        graph = random_graph(create_info)
+        if len(graph.edges()) == 0:
+            continue
+
+        system = System(graph, 0)
+        old_tables = system.tables()
+        system.simulate_edge_change(*random_change(graph))
+        new_tables = system.tables()
+
+        for node in graph.nodes():
+            diff = TableDiff(old_tables[node], new_tables[node])
+            decoded = decode_diff(encode_diff(diff), old_tables[node])
+            if decoded != diff:
+                print(f"FAIL at node {node} of {graph.data}")
+                print(f"expected: {diff}")
+                print(f"actual: {decoded}")
+                failed += 1
+
+    print("PASS" if failed == 0 else f"FAIL ({failed})")
+    print()
+
+def forwarding_test(create_info: RandomGraphCreateInfo, num_tests: int = 200):
+    """
+    Checks `Router.lookup` against a scan of the table for every deadline, after the forwarding
+    indices were updated by the messages of an edge change.
+    """
+    print("FORWARDING TEST")
+    print()
+
+    failed = 0
+    for _ in range(num_tests):
+        graph = random_graph(create_info)
+        if len(graph.edges()) == 0:
+            continue
+
+        system = System(graph, 0)
+        for router in system.routers.values():
+            router.lookup(0)
+        system.simulate_edge_change(*random_change(graph))
+
+        for (node, router) in system.routers.items():
+            max_deadline = max((entry.max_time for entry in router.table), default=0) + 1
+            for deadline in range(max_deadline + 1):
+                fitting = [entry for entry in router.table if entry.max_time <= deadline]
+                expected = min(((entry.expected_time, entry.max_time) for entry in fitting), default=None)
+
+                actual = router.lookup(deadline)
+                if actual == None:
+                    ok = expected == None
+                else:
+                    (next_hop, expected_time, max_time) = actual
+                    ok = (expected_time, max_time) == expected and any(
+                        entry.parent() == next_hop and (entry.expected_time, entry.max_time) == expected
+                        for entry in fitting
+                    )
+
+                if not ok:
+                    print(f"FAIL at node {node} deadline {deadline} of {graph.data}")
+                    print(f"expected: {expected}")
+                    print(f"actual: {actual}")
+                    failed += 1
+
+    print("PASS" if failed == 0 else f"FAIL ({failed})")
+    print()
+
+def path_bits_test(create_info: RandomGraphCreateInfo, num_tests: int = 200):
+    """
+    Builds the tables of two graphs with the same node labels at the same time and checks the
+    bitset membership of their paths against the nodes of the paths.
+    """
+    print("PATH BITS TEST")
+    print()
+
+    failed = 0
+    for _ in range(num_tests):
+        graphs = [random_graph(create_info), random_graph(create_info)]
+        tables = [baruah_label_setting(graph, 0, relax_ppd_nce) for graph in graphs]
+        nodes = set(graphs[0].nodes()) | set(graphs[1].nodes())
+
+        for (graph, graph_tables) in zip(graphs, tables):
+            for table in graph_tables.values():
+                for entry in table:
+                    for node in nodes:
+                        if (node in entry.parents) != (node in list(entry.parents)):
+                            print(f"FAIL for node {node} and {entry} of {graph.data}")
+                            failed += 1
+
+    print("PASS" if failed == 0 else f"FAIL ({failed})")
+    print()
+
+def simulation_test(create_info: RandomGraphCreateInfo, num_tests: int = 300):
+    """
+    Runs the initial calculation and an edge change on the virtual clock with sampled link delays
+    and checks that the routers end up with the fixed point tables.
+    """
+    print("SIMULATION TEST")
+    print()
+
+    failed = 0
+    for test_num in range(num_tests):
+        graph = random_graph(create_info)
+        if len(graph.edges()) == 0:
+            continue
+
+        simulator = ConvergenceSimulator(graph, 0, processing_cost=1.0, sample_delays=True, seed=test_num)
+        simulator.simulate_edge_change(*random_change(graph))
+
+        expected = baruah_label_setting(graph, 0, relax_ppd_nce)
+        actual = simulator.system.tables()
+        if actual != expected:
+            print(f"FAIL with seed {test_num} on {graph.data}")
+            failed += 1
+
+    print("PASS" if failed == 0 else f"FAIL ({failed})")
+    print()
+
+def sharding_test(create_info: RandomGraphCreateInfo, num_tests: int = 15, shards: int = 3):
+    """
+    Checks that a `ShardedSystem` ends with the same tables and message counts as a `System`
+    after the initial calculation, a single edge change and a batch of edge changes.
+    """
+    print("SHARDING TEST")
+    print()
+
+    failed = 0
+    for _ in range(num_tests):
+        graph = random_graph(create_info)
+        if len(graph.edges()) == 0:
+            continue
+
+        changes = [random_change(graph) for _ in range(3)]
+        system = System(deepcopy(graph), 0)
+        with ShardedSystem(deepcopy(graph), 0, shards) as sharded:
+            results = [(system.tables() == sharded.tables(), system.messages_sent, sharded.messages_sent)]
+
+            system.simulate_edge_change(*changes[0])
+            sharded.simulate_edge_change(*changes[0])
+            results.append((system.tables() == sharded.tables(), system.messages_sent, sharded.messages_sent))
+
+            system.simulate_edge_changes(changes[1:])
+            sharded.simulate_edge_changes(changes[1:])
+            results.append((system.tables() == sharded.tables(), system.messages_sent, sharded.messages_sent))
+
+        for (same_tables, messages_sent, sharded_messages_sent) in results:
+            if not same_tables or messages_sent != sharded_messages_sent:
+                print(f"FAIL on {graph.data} with changes {changes}")
+                print(f"same tables: {same_tables} messages: {messages_sent} sharded: {sharded_messages_sent}")
+                failed += 1
+                break
+
+    print("PASS" if failed == 0 else f"FAIL ({failed})")
+    print()
+
 def whatt():
     graph = Graph({0: {}, 1: {2: (57, 97), 3: (6, 13)}, 2: {1: (68, 68), 4: (18, 41)}, 3: {0: (8, 46), 2: (68, 86)}, 4: {3: (88, 97), 2: (8, 14)}})  
     test_algorithm(graph, 0, (1, 3), 9)
@@ -271,9 +445,15 @@ def whatt():
 
 if __name__ == "__main__":
     random.seed(12)
-    random_test(RandomGraphCreateInfo(
+    create_info = RandomGraphCreateInfo(
         max_delay=100,
         min_nodes=4,
         max_nodes=10,
         min_edges=3,
-    ))
+    )
+    wire_test(create_info)
+    forwarding_test(create_info)
+    path_bits_test(create_info)
+    simulation_test(create_info)
+    sharding_test(create_info)
+    random_test(create_info)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from structures import Node, Edge, Graph, Entry, Table
-from typing import Dict, Callable, Mapping
+from typing import Dict, Callable, Iterable, Mapping, List, Tuple
+from heapq import heappop, heappush
+from math import inf
 
 relax_iterations = { "relax_original": lambda v: v - 1, "relax_ppd_nce": lambda v: v - 1}
 
@@ -24,6 +26,166 @@ def baruah(graph: Graph, destination: Node, relax: Callable) -> Dict[Node, Table
 
     return tables
 
+def baruah_worklist(graph: Graph, destination: Node, relax: Callable) -> Dict[Node, Table]:
+    """
+    Computes the same tables as `baruah`, but only relaxes edges whose to node table changed 
+    since the edge was last relaxed and stops as soon as a round changes no table.
+
+    A relaxation only depends on the table of the to node (entries dropped from the from node 
+    table stay dominated), so skipping these edges while keeping the order of the edges within
+    a round gives exactly the tables of the fixed number of rounds of `baruah`.
+    """
+    nodes = graph.nodes()
+    edges = list(graph.edges())
+
+    tables: Dict[Node, Table] = {}
+    for node in nodes:
+        tables[node] = Table()
+    tables[destination] = Table(entries=set([Entry(0, [], 0)]))
+
+    relax_name = getattr(relax, "__name__", "unknown")
+    if not relax_name in relax_iterations.keys():
+        raise ValueError("relax is not a valid relaxation function")
+
+    # indices of the edges whose to node is the key
+    incoming: Dict[Node, List[int]] = {}
+    for (i, edge) in enumerate(edges):
+        incoming.setdefault(edge.to_node, []).append(i)
+
+    dirty = set(range(len(edges)))
+
+    iterations = relax_iterations[relax_name](len(nodes))
+    for _ in range(iterations):
+        if len(dirty) == 0:
+            break
+
+        # edges to relax in this round, in the order `baruah` relaxes them
+        queue = sorted(dirty)
+        queued = dirty
+        dirty = set()
+
+        while queue:
+            i = heappop(queue)
+            queued.remove(i)
+
+            edge = edges[i]
+            table_u = tables[edge.from_node]
+
+            previous_table_u = table_u.copy()
+            relax(edge, table_u, tables[edge.to_node])
+
+            if table_u == previous_table_u:
+                continue
+
+            for j in incoming.get(edge.from_node, []):
+                if i < j:
+                    # the edge comes later in this round
+                    if j not in queued:
+                        heappush(queue, j)
+                        queued.add(j)
+                else:
+                    dirty.add(j)
+
+    return tables
+
+def baruah_label_setting(graph: Graph, destination: Node, relax: Callable) -> Dict[Node, Table]:
+    """
+    Computes the tables of `relax_ppd_nce` by label setting: entries are taken from a priority queue
+    in (max_time, expected_time) order and are final when they are taken.
+
+    With non-negative delays an entry is never smaller than the entry it was extended from,
+    so the first entry taken for a node gives its d_min, and an entry can only be strictly dominated
+    by an entry of its bucket that was taken before it. The result is the fixed point of
+    `relax_ppd_nce`, which is what `baruah` returns unless its V - 1 passes stop before it.
+    """
+    relax_name = getattr(relax, "__name__", "unknown")
+    if relax_name != "relax_ppd_nce":
+        raise ValueError("label setting only supports relax_ppd_nce")
+
+    return _label_setting(graph.nodes(), _incoming_edges(graph), destination)
+
+def baruah_all_destinations(
+    graph: Graph, 
+    relax: Callable, 
+    destinations: Iterable[Node] | None = None
+) -> Dict[Node, Dict[Node, Table]]:
+    """
+    Computes the tables towards every destination in `destinations` (all nodes by default),
+    the result maps a destination to its tables.
+
+    With `relax_ppd_nce` these are the tables of `baruah_label_setting`, the fixed point, which differs
+    from the tables of `baruah` when its V - 1 passes do not converge. Every destination is computed
+    separately, the only work shared between them is one dict of the incoming edges of every node.
+    Other relaxation functions run `baruah_worklist` independently for every destination, so their
+    tables are the ones `baruah` returns.
+    """
+    relax_name = getattr(relax, "__name__", "unknown")
+    if not relax_name in relax_iterations.keys():
+        raise ValueError("relax is not a valid relaxation function")
+
+    nodes = graph.nodes()
+    if destinations == None:
+        destinations = nodes
+
+    result: Dict[Node, Dict[Node, Table]] = {}
+    if relax_name == "relax_ppd_nce":
+        incoming = _incoming_edges(graph)
+        for destination in destinations:
+            result[destination] = _label_setting(nodes, incoming, destination)
+    else:
+        for destination in destinations:
+            result[destination] = baruah_worklist(graph, destination, relax)
+
+    return result
+
+def _incoming_edges(graph: Graph) -> Dict[Node, List[Edge]]:
+    return {node: graph.incoming_edges(node) for node in graph.nodes()}
+
+def _label_setting(nodes: List[Node], incoming: Dict[Node, List[Edge]], destination: Node) -> Dict[Node, Table]:
+    tables: Dict[Node, Table] = {}
+    for node in nodes:
+        tables[node] = Table()
+
+    min_max_times: Dict[Node, int] = {}
+    # the last entry taken for every (node, parent) bucket
+    last_entries: Dict[Tuple[Node, Node | None], Entry] = {}
+
+    # (max_time, expected_time, insertion order, node, entry)
+    queue: List[Tuple[int, int, int, Node, Entry]] = [(0, 0, 0, destination, Entry(0, [], 0))]
+    pushed = 1
+
+    while queue:
+        (_, _, _, v, entry) = heappop(queue)
+
+        last = last_entries.get((v, entry.parent()))
+        if last != None and not (
+            entry.expected_time < last.expected_time
+            or (entry.expected_time == last.expected_time and entry.max_time == last.max_time)
+        ):
+            # strictly dominated by an entry of the same bucket
+            continue
+
+        last_entries[(v, entry.parent())] = entry
+        tables[v].add(entry)
+
+        if v not in min_max_times:
+            min_max_times[v] = entry.max_time
+
+        for edge in incoming[v]:
+            u = edge.from_node
+            if u in entry.parents:
+                # cyclic enties should not be generated
+                continue
+
+            max_time = max(edge.worst_case_delay + min_max_times[v], entry.max_time + edge.expected_delay)
+            expected_time = entry.expected_time + edge.expected_delay
+
+            new_entry = Entry(max_time, entry.parents.prepend(v, edge.bits), expected_time)
+            heappush(queue, (max_time, expected_time, pushed, u, new_entry))
+            pushed += 1
+
+    return tables
+
 def relax_original(edge: Edge, from_node_table: Table, to_node_table: Table):
     """
     The relaxation function from the paper Rapid Routing with Guaranteed Delay Bounds.
@@ -33,27 +195,33 @@ def relax_original(edge: Edge, from_node_table: Table, to_node_table: Table):
     v = edge.to_node
     table_v = to_node_table
 
-    if len(table_v.entries) == 0:
+    if len(table_v) == 0:
         # the table_v is empty there is nothing to update the table_u with
         return
 
     # min_max_time (d_min) is the smallest worst-case delay bound from u to the destination
-    min_max_time = edge.worst_case_delay + min([entry.max_time for entry in table_v.entries])
+    min_max_time = edge.worst_case_delay + table_v.min_max_time()
 
-    for entry in table_v.entries:
+    for entry in table_v:
         max_time = max(min_max_time, entry.max_time + edge.expected_delay)
         expected_time = entry.expected_time + edge.expected_delay
 
-        parents = entry.parents.copy()
-        parents.insert(0, v)
+        parents = entry.parents.prepend(v, edge.bits)
 
         new_entry = Entry(max_time, parents, expected_time)
         table_u.insert_sd(new_entry)
 
-def relax_ppd_nce(edge: Edge, from_node_table: Table, to_node_table: Table):
+def relax_ppd_nce(
+    edge: Edge, 
+    from_node_table: Table, 
+    to_node_table: Table, 
+    condition: Callable[[Entry], bool] | None = None
+):
     """
     Baruah relaxation with per parent domination and no cyclic entries. 
     Updates `from_node_table`.
+
+    If a `condition` is provided only the entries of `to_node_table` satisfying it are relaxed.
     """
     u = edge.from_node
     table_u = from_node_table
@@ -62,14 +230,22 @@ def relax_ppd_nce(edge: Edge, from_node_table: Table, to_node_table: Table):
 
     table_u.remove_all_entries_with_parent(v)
 
-    if len(table_v.entries) == 0:
+    if len(table_v) == 0:
         # the table_v is empty there is nothing to update the table_u with
         return
 
+    min_max_time_v = table_v.min_max_time(condition)
+    if min_max_time_v == inf:
+        # no entry satisfies the condition
+        return
+
     # min_max_time (d_min) is the smallest worst-case delay bound from u to the destination
-    min_max_time = edge.worst_case_delay + min([entry.max_time for entry in table_v.entries])
+    min_max_time = edge.worst_case_delay + min_max_time_v
+
+    for entry in table_v:
+        if condition != None and not condition(entry):
+            continue
 
-    for entry in table_v.entries:
         if u in entry.parents:
             # cyclic enties should not be generated
             continue
@@ -77,8 +253,7 @@ def relax_ppd_nce(edge: Edge, from_node_table: Table, to_node_table: Table):
         max_time = max(min_max_time, entry.max_time + edge.expected_delay)
         expected_time = entry.expected_time + edge.expected_delay
 
-        parents = entry.parents.copy()
-        parents.insert(0, v)
+        parents = entry.parents.prepend(v, edge.bits)
 
         new_entry = Entry(max_time, parents, expected_time)
         table_u.insert_ppd(new_entry)
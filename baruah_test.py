@@ -1,6 +1,12 @@
-from structures import Graph, Edge, Table, Entry, TableDiff
-from baruah import baruah, relax_original, relax_ppd_nce
+from structures import Node, Graph, Edge, Table, Entry, TableDiff
+from baruah import baruah, baruah_all_destinations, baruah_label_setting, baruah_worklist, relax_original, relax_ppd_nce
+from baruah_vectorized import baruah_vectorized
 from util import draw_graph
+from algorithm_test import RandomGraphCreateInfo, random_graph
+from typing import Callable, Dict, List
+import ast
+import random
+import sqlite3
 
 def simple_test():
     print("BARUAH TEST")
@@ -28,6 +34,89 @@ def simple_test():
 
     draw_graph(G)
 
+def fixed_point(graph: Graph, destination: Node, relax: Callable) -> Dict[Node, Table]:
+    """
+    Continues the passes of `baruah` until the tables stop changing.
+    """
+    tables = baruah(graph, destination, relax)
+    edges = graph.edges()
+
+    while True:
+        previous = {node: table.copy() for (node, table) in tables.items()}
+        for edge in edges:
+            relax(edge, tables[edge.from_node], tables[edge.to_node])
+
+        if tables == previous:
+            return tables
+
+def complex_test_graphs(num_cases: int) -> List[Graph]:
+    conn = sqlite3.connect("complex_test_cases.db")
+    rows = conn.execute("SELECT graph_data FROM test_cases ORDER BY id LIMIT ?", (num_cases,)).fetchall()
+    conn.close()
+
+    return [Graph(ast.literal_eval(graph_data)) for (graph_data,) in rows]
+
+def engines_test(num_random_graphs: int = 100, num_complex_graphs: int = 10):
+    """
+    Compares every engine to `baruah` on seeded random graphs and on graphs of complex_test_cases.db,
+    towards destination 0 and for `baruah_all_destinations` towards every node.
+
+    `baruah_worklist` has to return exactly the tables of `baruah`. The engines computing the fixed point
+    (`baruah_vectorized`, `baruah_label_setting` and `baruah_all_destinations` with `relax_ppd_nce`) are
+    compared to `fixed_point`, which differs from `baruah` when its V - 1 passes end before convergence.
+    """
+    print("BARUAH ENGINES TEST")
+    print()
+
+    create_info = RandomGraphCreateInfo(max_delay=100, min_nodes=2, max_nodes=12, min_edges=1)
+    graphs = []
+    for _ in range(num_random_graphs):
+        # mix in zero delays and ties, which `random_graph` rarely generates
+        data = random_graph(create_info).data
+        for edges in data.values():
+            for (v, (expected_delay, worst_case_delay)) in edges.items():
+                edges[v] = random.choice([(expected_delay, worst_case_delay), (0, worst_case_delay), (5, 10)])
+        graphs.append(Graph(data))
+    complex_graphs = complex_test_graphs(num_complex_graphs)
+
+    failures: Dict[str, int] = {}
+    def check(name: str, graph: Graph, expected, actual):
+        failures.setdefault(name, 0)
+        if expected != actual:
+            if failures[name] == 0:
+                print(f"{name}: first failure on {graph.data}")
+                print(f"expected: {expected}")
+                print(f"actual: {actual}")
+            failures[name] += 1
+
+    not_converged = 0
+    for graph in graphs + complex_graphs:
+        for relax in [relax_original, relax_ppd_nce]:
+            expected = baruah(graph, 0, relax)
+            check(f"baruah_worklist {relax.__name__}", graph, expected, baruah_worklist(graph, 0, relax))
+
+        expected = fixed_point(graph, 0, relax_ppd_nce)
+        if expected != baruah(graph, 0, relax_ppd_nce):
+            not_converged += 1
+        check("baruah_vectorized", graph, expected, baruah_vectorized(graph, 0, relax_ppd_nce))
+        check("baruah_label_setting", graph, expected, baruah_label_setting(graph, 0, relax_ppd_nce))
+
+        # the larger graphs of the database are too slow to compare for every destination
+        if graph in complex_graphs:
+            continue
+
+        all_tables = baruah_all_destinations(graph, relax_original)
+        for destination in graph.nodes():
+            check("baruah_all_destinations relax_original", graph, baruah(graph, destination, relax_original), all_tables[destination])
+
+        all_tables = baruah_all_destinations(graph, relax_ppd_nce)
+        for destination in graph.nodes():
+            check("baruah_all_destinations relax_ppd_nce", graph, fixed_point(graph, destination, relax_ppd_nce), all_tables[destination])
+
+    for (name, count) in failures.items():
+        print(f"{name}: {'PASS' if count == 0 else f'FAIL ({count})'}")
+    print(f"{len(graphs) + len(complex_graphs)} graphs, baruah did not converge on {not_converged}")
+
 def exploration():
     edge = Edge(2, 1, 3, 3)
     tab1 = Table()
@@ -47,4 +136,6 @@ def exploration():
     print(diff)
     print(len(diff))
 
-exploration()
\ No newline at end of file
+if __name__ == "__main__":
+    random.seed(12)
+    engines_test()
\ No newline at end of file
@@ -0,0 +1,254 @@
+from __future__ import annotations
+from structures import Node, Graph, Entry, Table, Path
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+
+# path id of the empty path
+EMPTY_PATH = 0
+
+class _Paths:
+    """
+    Interned paths stored as arrays, a path is its first node (`heads`) followed by another path (`tails`).
+
+    Path ids are assigned in order of creation, so the tail of a path always has a smaller id.
+    """
+    num_nodes: int
+    heads: np.ndarray
+    tails: np.ndarray
+    # sorted keys (tail * num_nodes + head) of all paths, and the ids of the paths with these keys
+    keys: np.ndarray
+    ids: np.ndarray
+
+    def __init__(self: _Paths, num_nodes: int):
+        self.num_nodes = num_nodes
+        self.heads = np.array([-1], dtype=np.int64)
+        self.tails = np.array([-1], dtype=np.int64)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.ids = np.empty(0, dtype=np.int64)
+
+    def prepend(self: _Paths, heads: np.ndarray, tails: np.ndarray) -> np.ndarray:
+        """
+        Returns the ids of the paths starting with `heads` followed by the paths `tails`.
+        """
+        keys = tails * self.num_nodes + heads
+
+        (unique_keys, inverse) = np.unique(keys, return_inverse=True)
+        positions = np.searchsorted(self.keys, unique_keys)
+        positions_in_bounds = np.minimum(positions, max(len(self.keys) - 1, 0))
+        if len(self.keys) == 0:
+            found = np.zeros(len(unique_keys), dtype=bool)
+        else:
+            found = self.keys[positions_in_bounds] == unique_keys
+
+        unique_ids = np.empty(len(unique_keys), dtype=np.int64)
+        unique_ids[found] = self.ids[positions_in_bounds[found]]
+
+        new_keys = unique_keys[~found]
+        new_ids = np.arange(len(self.heads), len(self.heads) + len(new_keys), dtype=np.int64)
+        unique_ids[~found] = new_ids
+
+        if 0 < len(new_keys):
+            self.heads = np.concatenate([self.heads, new_keys % self.num_nodes])
+            self.tails = np.concatenate([self.tails, new_keys // self.num_nodes])
+
+            keys = np.concatenate([self.keys, new_keys])
+            ids = np.concatenate([self.ids, new_ids])
+            order = np.argsort(keys, kind="stable")
+            self.keys = keys[order]
+            self.ids = ids[order]
+
+        return unique_ids[inverse]
+
+    def contains(self: _Paths, paths: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        """
+        Checks for every i whether `nodes[i]` is on the path `paths[i]`, walking all paths in lockstep.
+        """
+        result = np.zeros(len(paths), dtype=bool)
+        current = paths.copy()
+
+        active = current != EMPTY_PATH
+        while active.any():
+            indices = np.nonzero(active)[0]
+            result[indices] |= self.heads[current[indices]] == nodes[indices]
+            current[indices] = self.tails[current[indices]]
+            active[indices] = current[indices] != EMPTY_PATH
+
+        return result
+
+    def to_paths(self: _Paths, labels: List[Node]) -> List[Path]:
+        """
+        Converts all paths to `Path` objects over the node `labels`.
+        """
+        heads = self.heads.tolist()
+        tails = self.tails.tolist()
+
+        result = [Path.EMPTY]
+        for path_id in range(1, len(heads)):
+            result.append(result[tails[path_id]].prepend(labels[heads[path_id]]))
+
+        return result
+
+def _pareto_mask(groups: np.ndarray, max_times: np.ndarray, expected_times: np.ndarray) -> np.ndarray:
+    """
+    Given labels sorted by (group, max time, expected time) returns which of them are not strictly
+    dominated by another label of the same group.
+    """
+    count = len(groups)
+    if count == 0:
+        return np.zeros(0, dtype=bool)
+
+    indices = np.arange(count)
+
+    new_group = np.ones(count, dtype=bool)
+    new_group[1:] = groups[1:] != groups[:-1]
+    new_run = new_group.copy()
+    new_run[1:] |= max_times[1:] != max_times[:-1]
+
+    group_start = np.maximum.accumulate(np.where(new_group, indices, 0))
+    run_start = np.maximum.accumulate(np.where(new_run, indices, 0))
+
+    # running minimum of the expected time within each group, later groups are shifted down
+    # by more than the range of expected times so the minimum never reaches back into an earlier group
+    shift = int(expected_times.max()) - int(expected_times.min()) + 1
+    group_numbers = np.cumsum(new_group) - 1
+    shifted = expected_times - group_numbers * shift
+    running_min = np.minimum.accumulate(shifted) + group_numbers * shift
+
+    # smallest expected time of the labels in the group with a smaller max time
+    has_smaller = group_start < run_start
+    smaller_min = running_min[np.maximum(run_start - 1, 0)]
+
+    dominated = has_smaller & (smaller_min <= expected_times)
+    # labels with the same max time are sorted by expected time, the first one has the smallest
+    dominated |= expected_times[run_start] < expected_times
+
+    return ~dominated
+
+def baruah_vectorized(graph: Graph, destination: Node, relax: Callable, max_rounds: int | None = None) -> Dict[Node, Table]:
+    """
+    Computes the same tables as `baruah` with `relax_ppd_nce`, relaxing all edges of a round at once
+    with array operations.
+
+    The labels (entries) of all tables are stored in flat arrays. Each round relaxes every edge
+    against the labels of the previous round and repeats until the labels stop changing or
+    `max_rounds` (by default twice the number of nodes) rounds were done.
+
+    With per parent domination a table only depends on the tables of its successors, so the
+    result is the fixed point of the relaxation. `baruah` reaches the same tables unless its
+    V - 1 passes end before the tables stop changing, in which case it returns an intermediate state.
+    """
+    relax_name = getattr(relax, "__name__", "unknown")
+    if relax_name != "relax_ppd_nce":
+        raise ValueError("the vectorized engine only supports relax_ppd_nce")
+
+    nodes = graph.nodes()
+    num_nodes = len(nodes)
+    node_ids = {node: i for (i, node) in enumerate(nodes)}
+
+    if max_rounds == None:
+        max_rounds = 2 * num_nodes
+
+    edges = list(graph.edges())
+    from_nodes = np.array([node_ids[edge.from_node] for edge in edges], dtype=np.int64)
+    to_nodes = np.array([node_ids[edge.to_node] for edge in edges], dtype=np.int64)
+    expected_delays = np.array([edge.expected_delay for edge in edges], dtype=np.int64)
+    worst_case_delays = np.array([edge.worst_case_delay for edge in edges], dtype=np.int64)
+
+    paths = _Paths(num_nodes)
+
+    destination_id = node_ids[destination]
+    label_nodes = np.array([destination_id], dtype=np.int64)
+    label_max_times = np.array([0], dtype=np.int64)
+    label_expected_times = np.array([0], dtype=np.int64)
+    label_paths = np.array([EMPTY_PATH], dtype=np.int64)
+
+    for _ in range(max_rounds):
+        # labels grouped by node
+        order = np.argsort(label_nodes, kind="stable")
+        sorted_max_times = label_max_times[order]
+        sorted_expected_times = label_expected_times[order]
+        sorted_paths = label_paths[order]
+
+        counts = np.bincount(label_nodes, minlength=num_nodes)
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+        # d_min of every node with a non-empty table
+        min_max_times = np.full(num_nodes, np.iinfo(np.int64).max // 2, dtype=np.int64)
+        np.minimum.at(min_max_times, label_nodes, label_max_times)
+
+        # one candidate per edge and label of the to node of the edge
+        candidate_counts = counts[to_nodes]
+        candidate_edges = np.repeat(np.arange(len(edges)), candidate_counts)
+        first_candidates = np.cumsum(candidate_counts) - candidate_counts
+        candidate_labels = (
+            np.repeat(offsets[to_nodes], candidate_counts)
+            + np.arange(len(candidate_edges))
+            - np.repeat(first_candidates, candidate_counts)
+        )
+
+        candidate_from = from_nodes[candidate_edges]
+        candidate_tails = sorted_paths[candidate_labels]
+
+        # cyclic entries should not be generated
+        acyclic = ~paths.contains(candidate_tails, candidate_from)
+        candidate_edges = candidate_edges[acyclic]
+        candidate_labels = candidate_labels[acyclic]
+        candidate_from = candidate_from[acyclic]
+        candidate_tails = candidate_tails[acyclic]
+
+        candidate_delays = expected_delays[candidate_edges]
+        candidate_max_times = np.maximum(
+            min_max_times[to_nodes[candidate_edges]] + worst_case_delays[candidate_edges],
+            sorted_max_times[candidate_labels] + candidate_delays
+        )
+        candidate_expected_times = sorted_expected_times[candidate_labels] + candidate_delays
+
+        # per parent domination, the candidates of an edge form the bucket of its to node
+        order = np.lexsort((candidate_expected_times, candidate_max_times, candidate_edges))
+        keep = order[_pareto_mask(candidate_edges[order], candidate_max_times[order], candidate_expected_times[order])]
+
+        new_paths = paths.prepend(to_nodes[candidate_edges[keep]], candidate_tails[keep])
+
+        new_label_nodes = np.concatenate([[destination_id], candidate_from[keep]])
+        new_label_max_times = np.concatenate([[0], candidate_max_times[keep]])
+        new_label_expected_times = np.concatenate([[0], candidate_expected_times[keep]])
+        new_label_paths = np.concatenate([[EMPTY_PATH], new_paths])
+
+        converged = _same_labels(
+            (label_nodes, label_paths, label_max_times, label_expected_times),
+            (new_label_nodes, new_label_paths, new_label_max_times, new_label_expected_times),
+        )
+
+        label_nodes = new_label_nodes
+        label_max_times = new_label_max_times
+        label_expected_times = new_label_expected_times
+        label_paths = new_label_paths
+
+        if converged:
+            break
+
+    node_paths = paths.to_paths(nodes)
+
+    tables: Dict[Node, Table] = {}
+    for node in nodes:
+        tables[node] = Table()
+
+    for (node_id, max_time, expected_time, path_id) in zip(
+        label_nodes.tolist(), label_max_times.tolist(), label_expected_times.tolist(), label_paths.tolist()
+    ):
+        tables[nodes[node_id]].add(Entry(max_time, node_paths[path_id], expected_time))
+
+    return tables
+
+def _same_labels(a: Tuple[np.ndarray, ...], b: Tuple[np.ndarray, ...]) -> bool:
+    """
+    Checks whether two sets of labels (nodes, paths, max times, expected times) are the same.
+    """
+    if len(a[0]) != len(b[0]):
+        return False
+
+    # a node and a path identify a label
+    order_a = np.lexsort((a[1], a[0]))
+    order_b = np.lexsort((b[1], b[0]))
+
+    return all(np.array_equal(x[order_a], y[order_b]) for (x, y) in zip(a, b))
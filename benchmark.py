@@ -2,6 +2,7 @@ from copy import deepcopy
 import math
 from multiprocessing import Manager, Pool, cpu_count, Process
 from algorithm import System
+from scheduling import schedulers
 from structures import Node, Graph, Edge
 from typing import Callable, Tuple, List
 from dataclasses import dataclass
@@ -13,6 +14,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 from typing import Dict
 import sqlite3
+import ast
+import sys
 
 
 def random_weights(max_delay: int) -> Tuple[int, int]:
@@ -447,7 +450,61 @@ def find_complex_test_cases(threads: int):
         
 
 
+def scheduler_benchmark(create_info: RandomGraphCreateInfo, num_runs: int, num_complex_cases: int | None = None):
+    """
+    Compares the message scheduling policies on `num_runs` random graphs and on the test cases
+    in complex_test_cases.db (the first `num_complex_cases` of them if provided).
+
+    The graphs of the test cases are stored with their change already applied, so the edge of the
+    change gets a newly drawn expected delay instead.
+    """
+    cases = []
+    for _ in range(num_runs):
+        graph = random_graph(create_info)
+        edge = random.choice(list(graph.edges()))
+        new_delay = random.randint(0, edge.worst_case_delay)
+        cases.append(("random", graph.data, (edge.from_node, edge.to_node), new_delay))
+
+    conn = sqlite3.connect("complex_test_cases.db")
+    query = "SELECT graph_data, change_from_node, change_to_node, new_delay FROM test_cases ORDER BY id"
+    if num_complex_cases != None:
+        query += f" LIMIT {int(num_complex_cases)}"
+    for (graph_data, from_node, to_node, stored_delay) in conn.execute(query).fetchall():
+        graph_data = ast.literal_eval(graph_data)
+        worst_case_delay = graph_data[from_node][to_node][1]
+        new_delay = random.choice([delay for delay in range(worst_case_delay + 1) if delay != stored_delay])
+        cases.append(("complex", graph_data, (from_node, to_node), new_delay))
+    conn.close()
+
+    for kind in ["random", "complex"]:
+        kind_cases = [case for case in cases if case[0] == kind]
+        if len(kind_cases) == 0:
+            continue
+
+        print(f"{kind} test cases: {len(kind_cases)}")
+        for (name, scheduler) in schedulers.items():
+            messages = []
+            times = []
+            for (_, graph_data, edge, new_delay) in kind_cases:
+                system = System(Graph(deepcopy(graph_data)), 0, scheduler=scheduler())
+
+                start = time.perf_counter_ns()
+                system.simulate_edge_change(edge, new_delay)
+                times.append((time.perf_counter_ns() - start) / 1e6)
+                messages.append(system.messages_sent)
+
+            print(
+                f"    {name}: messages mean {np.mean(messages):.1f} max {np.max(messages)}, "
+                f"time mean {np.mean(times):.3f} ms std {np.std(times):.3f} ms"
+            )
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "schedulers":
+        random.seed(12)
+        scheduler_benchmark(RandomGraphCreateInfo(max_delay=100, min_nodes=5, max_nodes=50, min_edges=3), 200)
+        sys.exit()
+
     # plt.style.use("bmh")
     # create_info = RandomBenchmarkCreateInfo(
     #     graph_create_info=RandomGraphCreateInfo(
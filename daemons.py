@@ -0,0 +1,299 @@
+from __future__ import annotations
+from algorithm import Message, Router, System
+from structures import Entry, Node, Edge, Graph, Table, TableDiff
+from tracing import Tracer
+from wire import decode_diff, encode_diff, read_node, read_varint, write_node, write_varint
+from typing import Dict, List, Set, Tuple
+import asyncio
+import struct
+import time
+
+# frames are a 4 byte payload length and a 1 byte kind followed by the payload
+FRAME_HEADER = struct.Struct("!IB")
+FRAME_MESSAGE = 0
+FRAME_EDGES = 1
+
+def encode_message(message: Message) -> bytes:
+    buffer = bytearray()
+    if message.from_node == None:
+        buffer.append(0)
+    else:
+        buffer.append(1)
+        write_node(buffer, message.from_node)
+    write_node(buffer, message.to_node)
+    buffer += encode_diff(message.changes)
+    return bytes(buffer)
+
+def decode_message(data: bytes, table: Table) -> Message:
+    """
+    Decodes a message written by `encode_message` for the router with the `table`.
+    """
+    from_node = None
+    offset = 1
+    if data[0] == 1:
+        (from_node, offset) = read_node(data, offset)
+    (to_node, offset) = read_node(data, offset)
+    return Message(from_node, to_node, decode_diff(data, table, offset))
+
+def encode_edges(edges: List[Edge]) -> bytes:
+    buffer = bytearray()
+    write_varint(buffer, len(edges))
+    for edge in edges:
+        write_node(buffer, edge.from_node)
+        write_node(buffer, edge.to_node)
+        write_varint(buffer, edge.expected_delay)
+        write_varint(buffer, edge.worst_case_delay)
+    return bytes(buffer)
+
+def decode_edges(data: bytes) -> List[Edge]:
+    edges = []
+    (num_edges, offset) = read_varint(data, 0)
+    for _ in range(num_edges):
+        (from_node, offset) = read_node(data, offset)
+        (to_node, offset) = read_node(data, offset)
+        (expected_delay, offset) = read_varint(data, offset)
+        (worst_case_delay, offset) = read_varint(data, offset)
+        edges.append(Edge(from_node, to_node, expected_delay, worst_case_delay))
+    return edges
+
+class NetworkReport:
+    # seconds between injecting the change and the last router finishing its processing
+    convergence_latency: float
+    messages_sent: int
+    # bytes of the frames sent between routers
+    bytes_sent: int
+
+    def __init__(self: NetworkReport, convergence_latency: float, messages_sent: int, bytes_sent: int):
+        self.convergence_latency = convergence_latency
+        self.messages_sent = messages_sent
+        self.bytes_sent = bytes_sent
+
+    @property
+    def messages_per_second(self: NetworkReport) -> float:
+        if self.convergence_latency == 0:
+            return 0.0
+        return self.messages_sent / self.convergence_latency
+
+    def __str__(self: NetworkReport):
+        return (
+            f"NetworkReport: latency {self.convergence_latency * 1000:.3f} ms messages {self.messages_sent} "
+            f"({self.messages_per_second:.0f}/s) bytes {self.bytes_sent}"
+        )
+
+class RouterDaemon:
+    """
+    Runs a `Router` behind a TCP server on the loopback interface, it takes the place of the `System` of the router.
+
+    The daemon keeps a connection to every predecessor of its router, the messages of the router
+    are encoded with `encode_message` and written to these connections.
+
+    A daemon never waits for its connections to drain: with edges in both directions two routers
+    waiting for each other to read would stop reading themselves and deadlock. Frames are buffered
+    instead, backpressure is only applied to the frames the `RouterNetwork` injects.
+    """
+    network: RouterNetwork
+    router: Router
+    tracer: Tracer
+    path_length_limit: int
+    server: asyncio.Server | None
+    port: int
+    writers: Dict[Node, asyncio.StreamWriter]
+    # tasks handling the incoming connections
+    handlers: Set[asyncio.Task]
+
+    is_considered = System.is_considered
+
+    def __init__(self: RouterDaemon, network: RouterNetwork, node: Node, incoming_edges: List[Edge]):
+        self.network = network
+        self.tracer = Tracer()
+        self.path_length_limit = network.path_length_limit
+        self.router = Router(self, node, incoming_edges)
+        self.server = None
+        self.port = 0
+        self.writers = {}
+        self.handlers = set()
+
+    async def listen(self: RouterDaemon):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def connect(self: RouterDaemon):
+        for edge in self.router.incoming_edges:
+            if edge.from_node not in self.writers:
+                port = self.network.daemons[edge.from_node].port
+                (_, writer) = await asyncio.open_connection("127.0.0.1", port)
+                self.writers[edge.from_node] = writer
+
+    def send(self: RouterDaemon, message: Message):
+        self.network.write(self.writers[message.to_node], FRAME_MESSAGE, encode_message(message))
+
+    async def _handle(self: RouterDaemon, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        try:
+            while True:
+                (length, kind) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                payload = await reader.readexactly(length)
+
+                try:
+                    if kind == FRAME_MESSAGE:
+                        self.router.send(decode_message(payload, self.router.table))
+                    elif kind == FRAME_EDGES:
+                        self.router.update_incoming_edges(decode_edges(payload))
+                except Exception as error:
+                    self.network.fail(error)
+                    return
+
+                self.network.processed()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self.handlers.discard(task)
+
+    def disconnect(self: RouterDaemon):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+    async def close(self: RouterDaemon):
+        """
+        Waits for the incoming connections to be closed by their senders and stops the server.
+        """
+        await asyncio.gather(*self.handlers)
+
+        if self.server != None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+class RouterNetwork:
+    """
+    Runs every router of the `graph` as a `RouterDaemon` in the current event loop,
+    the routers exchange their messages through loopback TCP connections.
+
+    The network is converged when every frame sent was processed by its receiver.
+    """
+    graph: Graph
+    destination: Node
+    path_length_limit: int
+    daemons: Dict[Node, RouterDaemon]
+    # connections of the coordinator to every router
+    writers: Dict[Node, asyncio.StreamWriter]
+    messages_sent: int
+    bytes_sent: int
+    in_flight: int
+    converged: asyncio.Event | None
+    error: Exception | None
+    initial_report: NetworkReport | None
+
+    def __init__(self: RouterNetwork, graph: Graph, destination: Node):
+        self.graph = graph
+        self.destination = destination
+        self.path_length_limit = len(graph.nodes()) - 1
+        self.daemons = {}
+        for node in graph.nodes():
+            self.daemons[node] = RouterDaemon(self, node, graph.incoming_edges(node))
+
+        self.writers = {}
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.converged = None
+        self.error = None
+        self.initial_report = None
+
+    async def start(self: RouterNetwork):
+        """
+        Starts the daemons, connects them and calculates the initial tables.
+        """
+        for daemon in self.daemons.values():
+            await daemon.listen()
+        for daemon in self.daemons.values():
+            await daemon.connect()
+        for (node, daemon) in self.daemons.items():
+            (_, writer) = await asyncio.open_connection("127.0.0.1", daemon.port)
+            self.writers[node] = writer
+
+        diff = TableDiff(Table(), Table(set([Entry(0, [], 0)])))
+        message = Message(None, self.destination, diff)
+        self.initial_report = await self._run(self.destination, FRAME_MESSAGE, encode_message(message))
+
+    def write(self: RouterNetwork, writer: asyncio.StreamWriter, kind: int, payload: bytes):
+        writer.write(FRAME_HEADER.pack(len(payload), kind) + payload)
+        self.in_flight += 1
+        if kind == FRAME_MESSAGE:
+            self.messages_sent += 1
+            self.bytes_sent += FRAME_HEADER.size + len(payload)
+
+    def processed(self: RouterNetwork):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self.converged.set()
+
+    def fail(self: RouterNetwork, error: Exception):
+        self.error = error
+        self.converged.set()
+
+    async def _run(self: RouterNetwork, node: Node, kind: int, payload: bytes) -> NetworkReport:
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.converged = asyncio.Event()
+
+        start = time.perf_counter()
+        writer = self.writers[node]
+        self.write(writer, kind, payload)
+        await writer.drain()
+        await self.converged.wait()
+        latency = time.perf_counter() - start
+
+        if self.error != None:
+            raise RuntimeError("a router failed to process a frame") from self.error
+
+        return NetworkReport(latency, self.messages_sent, self.bytes_sent)
+
+    async def simulate_edge_change(self: RouterNetwork, edge: Tuple[Node, Node], new_expected_delay: int) -> NetworkReport:
+        """
+        Sends the new incoming edges to the router detecting the change and waits for the network to converge.
+        """
+        (u, v) = edge
+        self.graph.modify_edge_weights(u, v, new_expected_delay=new_expected_delay)
+        return await self._run(v, FRAME_EDGES, encode_edges(self.graph.incoming_edges(v)))
+
+    def tables(self: RouterNetwork) -> Dict[Node, Table]:
+        return {node: daemon.router.table.copy() for (node, daemon) in self.daemons.items()}
+
+    async def close(self: RouterNetwork):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+        for daemon in self.daemons.values():
+            daemon.disconnect()
+        for daemon in self.daemons.values():
+            await daemon.close()
+
+    async def __aenter__(self: RouterNetwork) -> RouterNetwork:
+        await self.start()
+        return self
+
+    async def __aexit__(self: RouterNetwork, *args):
+        await self.close()
+
+def run_network(
+    graph: Graph,
+    destination: Node,
+    changes: List[Tuple[Tuple[Node, Node], int]]
+) -> Tuple[NetworkReport, List[NetworkReport]]:
+    """
+    Starts a `RouterNetwork` in a new event loop, applies the edge `changes` one by one and
+    returns the report of the initial calculation and of every change.
+    """
+    async def run() -> Tuple[NetworkReport, List[NetworkReport]]:
+        async with RouterNetwork(graph, destination) as network:
+            reports = []
+            for (edge, new_expected_delay) in changes:
+                reports.append(await network.simulate_edge_change(edge, new_expected_delay))
+            return (network.initial_report, reports)
+
+    return asyncio.run(run())
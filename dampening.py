@@ -0,0 +1,192 @@
+from __future__ import annotations
+from algorithm import System
+from baruah import baruah_label_setting, relax_ppd_nce
+from structures import Node, Graph
+from typing import Callable, Dict, Tuple
+import time
+
+class DampeningPolicy:
+    """
+    Decides which expected delay changes of an edge are propagated to the routers.
+
+    A change is propagated only if it differs from the last propagated delay by at least
+    `absolute_threshold` and by at least `relative_threshold` times the last propagated delay,
+    at least `hold_time` seconds passed since the last propagated change of the edge and the
+    flap penalty of the edge is below `suppress_penalty`.
+
+    Every reported change adds `flap_penalty` to the penalty of the edge, whether it is propagated or
+    suppressed, and the penalty halves every `penalty_half_life` seconds, so an edge that keeps changing
+    is suppressed until it settles.
+    """
+    absolute_threshold: int
+    relative_threshold: float
+    hold_time: float
+    flap_penalty: float
+    suppress_penalty: float
+    penalty_half_life: float
+
+    def __init__(
+        self: DampeningPolicy,
+        absolute_threshold: int = 0,
+        relative_threshold: float = 0.0,
+        hold_time: float = 0.0,
+        flap_penalty: float = 0.0,
+        suppress_penalty: float = 1.0,
+        penalty_half_life: float = 1.0
+    ):
+        if penalty_half_life <= 0:
+            raise ValueError("`penalty_half_life` should be positive")
+
+        self.absolute_threshold = absolute_threshold
+        self.relative_threshold = relative_threshold
+        self.hold_time = hold_time
+        self.flap_penalty = flap_penalty
+        self.suppress_penalty = suppress_penalty
+        self.penalty_half_life = penalty_half_life
+
+class _EdgeState:
+    # the delay the routers know about
+    propagated_delay: int
+    # the latest delay reported for the edge
+    delay: int
+    last_propagation: float | None
+    penalty: float
+    penalty_time: float
+
+    def __init__(self: _EdgeState, delay: int):
+        self.propagated_delay = delay
+        self.delay = delay
+        self.last_propagation = None
+        self.penalty = 0.0
+        self.penalty_time = 0.0
+
+class DampenedSystem:
+    """
+    Passes expected delay changes to a `System` according to a `DampeningPolicy`.
+
+    Suppressed changes are remembered, `flush` propagates the ones the policy allows by now.
+    """
+    system: System
+    policy: DampeningPolicy
+    clock: Callable[[], float]
+    edges: Dict[Tuple[Node, Node], _EdgeState]
+    updates_propagated: int
+    updates_suppressed: int
+    messages_sent: int
+
+    def __init__(self: DampenedSystem, system: System, policy: DampeningPolicy, clock: Callable[[], float] = time.monotonic):
+        self.system = system
+        self.policy = policy
+        self.clock = clock
+        self.edges = {}
+        self.updates_propagated = 0
+        self.updates_suppressed = 0
+        self.messages_sent = 0
+
+    def simulate_edge_change(self: DampenedSystem, edge: Tuple[Node, Node], new_expected_delay: int, now: float | None = None) -> bool:
+        """
+        Reports a new expected delay of the `edge` and returns whether it was propagated.
+        """
+        if now == None:
+            now = self.clock()
+
+        state = self._state(edge)
+        if new_expected_delay != state.delay:
+            state.penalty = self._penalty(state, now) + self.policy.flap_penalty
+            state.penalty_time = now
+        state.delay = new_expected_delay
+
+        if self._allows(state, now):
+            self._propagate(edge, state, now)
+            return True
+
+        self.updates_suppressed += 1
+        return False
+
+    def flush(self: DampenedSystem, now: float | None = None) -> int:
+        """
+        Propagates the suppressed changes the policy allows at `now`, returns how many were propagated.
+        """
+        if now == None:
+            now = self.clock()
+
+        propagated = 0
+        for (edge, state) in self.edges.items():
+            if state.delay != state.propagated_delay and self._allows(state, now):
+                self._propagate(edge, state, now)
+                propagated += 1
+
+        return propagated
+
+    def stale_edges(self: DampenedSystem) -> Dict[Tuple[Node, Node], Tuple[int, int]]:
+        """
+        The edges whose latest delay was not propagated, with the (propagated, latest) delays.
+        """
+        result = {}
+        for (edge, state) in self.edges.items():
+            if state.delay != state.propagated_delay:
+                result[edge] = (state.propagated_delay, state.delay)
+
+        return result
+
+    def table_staleness(self: DampenedSystem) -> int:
+        """
+        The number of routers whose table differs from the table they would have
+        if every suppressed change had been propagated (the fixed point of `baruah_label_setting`).
+        """
+        stale_edges = self.stale_edges()
+        if len(stale_edges) == 0:
+            return 0
+
+        data = {u: dict(edges) for (u, edges) in self.system.graph.data.items()}
+        for ((u, v), (_, delay)) in stale_edges.items():
+            data[u][v] = (delay, data[u][v][1])
+
+        expected_tables = baruah_label_setting(Graph(data), self.system.destination, relax_ppd_nce)
+
+        stale_routers = 0
+        for (node, router) in self.system.routers.items():
+            if router.table != expected_tables[node]:
+                stale_routers += 1
+
+        return stale_routers
+
+    def _state(self: DampenedSystem, edge: Tuple[Node, Node]) -> _EdgeState:
+        state = self.edges.get(edge)
+        if state == None:
+            (u, v) = edge
+            state = _EdgeState(self.system.graph.edge(u, v).expected_delay)
+            self.edges[edge] = state
+
+        return state
+
+    def _penalty(self: DampenedSystem, state: _EdgeState, now: float) -> float:
+        elapsed = max(now - state.penalty_time, 0.0)
+        return state.penalty * 0.5 ** (elapsed / self.policy.penalty_half_life)
+
+    def _allows(self: DampenedSystem, state: _EdgeState, now: float) -> bool:
+        policy = self.policy
+
+        change = abs(state.delay - state.propagated_delay)
+        if change == 0:
+            return False
+        if change < policy.absolute_threshold:
+            return False
+        if change < policy.relative_threshold * state.propagated_delay:
+            return False
+
+        if state.last_propagation != None and now - state.last_propagation < policy.hold_time:
+            return False
+
+        if policy.suppress_penalty <= self._penalty(state, now):
+            return False
+
+        return True
+
+    def _propagate(self: DampenedSystem, edge: Tuple[Node, Node], state: _EdgeState, now: float):
+        state.last_propagation = now
+        state.propagated_delay = state.delay
+
+        self.system.simulate_edge_change(edge, state.delay)
+        self.updates_propagated += 1
+        self.messages_sent += self.system.messages_sent
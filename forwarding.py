@@ -0,0 +1,112 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from math import inf
+from structures import Entry, Node, Table, TableDiff
+from typing import List, Set, Tuple
+
+class ForwardingIndex:
+    """
+    Answers which entry of a routing table a packet with a deadline should be forwarded along:
+    the entry with the smallest expected time among the entries with a max time within the deadline.
+
+    The entries are kept sorted by (max time, expected time) together with the position of the
+    entry with the smallest expected time up to every position. Changing the entries invalidates
+    these prefix minimums from the first changed position on, they are recomputed by the next
+    lookup that needs them.
+    """
+    members: Set[Entry]
+    keys: List[Tuple[int, int]]
+    entries: List[Entry]
+    # best[i] is the position of the entry with the smallest expected time among entries[:i + 1]
+    best: List[int]
+    # best[:valid] is up to date
+    valid: int
+
+    def __init__(self: ForwardingIndex, table: Table | None = None):
+        self.members = set(table or ())
+        self.entries = sorted(self.members, key=lambda entry: (entry.max_time, entry.expected_time))
+        self.keys = [(entry.max_time, entry.expected_time) for entry in self.entries]
+        self.best = [0] * len(self.entries)
+        self.valid = 0
+
+    def add(self: ForwardingIndex, entry: Entry) -> None:
+        if entry in self.members:
+            return
+
+        key = (entry.max_time, entry.expected_time)
+        i = bisect_right(self.keys, key)
+
+        self.members.add(entry)
+        self.keys.insert(i, key)
+        self.entries.insert(i, entry)
+        self.best.insert(i, 0)
+        self.valid = min(self.valid, i)
+
+    def discard(self: ForwardingIndex, entry: Entry) -> None:
+        if entry not in self.members:
+            return
+
+        i = bisect_left(self.keys, (entry.max_time, entry.expected_time))
+        while self.entries[i] != entry:
+            i += 1
+
+        self.members.remove(entry)
+        del self.keys[i]
+        del self.entries[i]
+        del self.best[i]
+        self.valid = min(self.valid, i)
+
+    def apply(self: ForwardingIndex, diff: TableDiff) -> None:
+        """
+        Applies the changes in the same way as `TableDiff.apply` applies them to a table.
+        """
+        for removed_entry in diff.removed:
+            self.discard(removed_entry)
+
+        for added_entry in diff.added:
+            self.add(added_entry)
+
+    def _update(self: ForwardingIndex, end: int) -> None:
+        """
+        Brings the prefix minimums up to date up to position `end` (exclusive).
+        """
+        best = self.best
+        entries = self.entries
+
+        i = self.valid
+        current = best[i - 1] if 0 < i else -1
+        while i < end:
+            if current == -1 or entries[i].expected_time < entries[current].expected_time:
+                current = i
+            best[i] = current
+            i += 1
+
+        self.valid = max(self.valid, end)
+
+    def lookup_entry(self: ForwardingIndex, deadline: int) -> Entry | None:
+        """
+        Returns the entry with the smallest expected time whose max time is at most `deadline`,
+        on ties the one with the smallest max time. Returns `None` if no entry fits the deadline.
+        """
+        i = bisect_right(self.keys, (deadline, inf))
+        if i == 0:
+            return None
+
+        if self.valid < i:
+            self._update(i)
+
+        return self.entries[self.best[i - 1]]
+
+    def lookup(self: ForwardingIndex, deadline: int) -> Tuple[Node | None, int, int] | None:
+        """
+        Returns the (next hop, expected time, max time) of the entry `lookup_entry` finds for the `deadline`,
+        the next hop is `None` at the destination.
+        """
+        entry = self.lookup_entry(deadline)
+        if entry == None:
+            return None
+
+        return (entry.parent(), entry.expected_time, entry.max_time)
+
+    def __len__(self: ForwardingIndex):
+        return len(self.entries)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+from baruah import _label_setting, baruah_worklist, relax_original, relax_ppd_nce
+from structures import Node, Edge, Graph, Entry, Table, Path, PathWriter
+from typing import Callable, Dict, Iterable, List, Tuple
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+
+# the graph of the worker process, attached in `_init_worker`
+_worker_graph: Graph | None = None
+_worker_incoming: Dict[int, List[Edge]] | None = None
+_worker_memory: SharedMemory | None = None
+
+relax_functions = {"relax_original": relax_original, "relax_ppd_nce": relax_ppd_nce}
+
+def _share_graph(graph: Graph, node_ids: Dict[Node, int]) -> SharedMemory:
+    """
+    Writes the incoming edges of the graph in CSR form to a new shared memory block:
+    the number of nodes and edges, the offsets of the incoming edges of every node
+    followed by the from node, expected delay and worst case delay of every edge.
+    """
+    nodes = graph.nodes()
+    num_nodes = len(nodes)
+    num_edges = sum(len(graph.incoming_edges(node)) for node in nodes)
+
+    memory = SharedMemory(create=True, size=8 * (2 + num_nodes + 1 + 3 * num_edges))
+    buffer = np.ndarray((2 + num_nodes + 1 + 3 * num_edges,), dtype=np.int64, buffer=memory.buf)
+    buffer[0] = num_nodes
+    buffer[1] = num_edges
+
+    offsets = buffer[2:2 + num_nodes + 1]
+    edges = buffer[2 + num_nodes + 1:].reshape((3, num_edges))
+
+    offset = 0
+    for (i, node) in enumerate(nodes):
+        offsets[i] = offset
+        for edge in graph.incoming_edges(node):
+            edges[0, offset] = node_ids[edge.from_node]
+            edges[1, offset] = edge.expected_delay
+            edges[2, offset] = edge.worst_case_delay
+            offset += 1
+    offsets[num_nodes] = offset
+
+    del buffer, offsets, edges
+    return memory
+
+def _init_worker(memory_name: str):
+    """
+    Attaches the shared graph and builds the graph over node ids (0 to V - 1) used by the worker.
+    """
+    global _worker_graph, _worker_incoming, _worker_memory
+
+    _worker_memory = SharedMemory(name=memory_name)
+    buffer = np.ndarray((2,), dtype=np.int64, buffer=_worker_memory.buf)
+    (num_nodes, num_edges) = buffer.tolist()
+    buffer = np.ndarray((2 + num_nodes + 1 + 3 * num_edges,), dtype=np.int64, buffer=_worker_memory.buf)
+
+    offsets = buffer[2:2 + num_nodes + 1].tolist()
+    edges = buffer[2 + num_nodes + 1:].reshape((3, num_edges)).tolist()
+    del buffer
+
+    adjacency_list: Dict[Node, Dict[Node, Tuple[int, int]]] = {v: {} for v in range(num_nodes)}
+    for v in range(num_nodes):
+        for i in range(offsets[v], offsets[v + 1]):
+            adjacency_list[edges[0][i]][v] = (edges[1][i], edges[2][i])
+
+    _worker_graph = Graph(adjacency_list)
+    _worker_incoming = {v: _worker_graph.incoming_edges(v) for v in range(num_nodes)}
+
+def _compute(task: Tuple[int, str]) -> Tuple[int, str, int]:
+    """
+    Computes the tables of one destination in a worker and writes them to a new shared memory block,
+    returning the destination, the name of the block and its length in integers.
+
+    The block holds the number of paths and entries, the (head, tail) of every path, where the tail
+    refers to an earlier path or is -1 for the empty path, and the (node, max time, expected time, path)
+    of every entry.
+    """
+    (destination, relax_name) = task
+
+    if relax_name == "relax_ppd_nce":
+        tables = _label_setting(_worker_graph.nodes(), _worker_incoming, destination)
+    else:
+        tables = baruah_worklist(_worker_graph, destination, relax_functions[relax_name])
+
+    path_writer = PathWriter(-1)
+    entries: List[int] = []
+    for (node, table) in tables.items():
+        for entry in table:
+            entries.extend((node, entry.max_time, entry.expected_time, path_writer.reference(entry.parents)))
+
+    paths = [value for path in path_writer.paths for value in path]
+
+    length = 2 + len(paths) + len(entries)
+    memory = SharedMemory(create=True, size=8 * length)
+    buffer = np.ndarray((length,), dtype=np.int64, buffer=memory.buf)
+    buffer[0] = len(paths) // 2
+    buffer[1] = len(entries) // 4
+    buffer[2:2 + len(paths)] = paths
+    buffer[2 + len(paths):] = entries
+    del buffer
+
+    name = memory.name
+    memory.close()
+
+    return (destination, name, length)
+
+def _read_tables(name: str, length: int, nodes: List[Node]) -> Dict[Node, Table]:
+    """
+    Reads the tables written by `_compute` and frees the shared memory block.
+    """
+    memory = SharedMemory(name=name)
+    try:
+        buffer = np.ndarray((length,), dtype=np.int64, buffer=memory.buf)
+        (num_paths, num_entries) = buffer[:2].tolist()
+        paths = buffer[2:2 + 2 * num_paths].tolist()
+        entries = buffer[2 + 2 * num_paths:].tolist()
+        del buffer
+    finally:
+        memory.close()
+        memory.unlink()
+
+    node_paths: List[Path] = []
+    for i in range(num_paths):
+        (head, tail) = (paths[2 * i], paths[2 * i + 1])
+        tail_path = Path.EMPTY if tail == -1 else node_paths[tail]
+        node_paths.append(tail_path.prepend(nodes[head]))
+
+    tables: Dict[Node, Table] = {node: Table() for node in nodes}
+    for i in range(num_entries):
+        (node, max_time, expected_time, path) = entries[4 * i:4 * i + 4]
+        parents = Path.EMPTY if path == -1 else node_paths[path]
+        tables[nodes[node]].add(Entry(max_time, parents, expected_time))
+
+    return tables
+
+def baruah_all_destinations_parallel(
+    graph: Graph,
+    relax: Callable,
+    destinations: Iterable[Node] | None = None,
+    processes: int | None = None
+) -> Dict[Node, Dict[Node, Table]]:
+    """
+    Computes the same tables as `baruah_all_destinations` with a pool of `processes` worker processes
+    (the number of CPUs by default).
+
+    The graph is written once to a shared memory block that every worker attaches to. Each worker
+    computes the tables of one destination at a time and writes them to a shared memory block in a
+    compact form, only the name of the block is sent back to this process.
+    """
+    relax_name = getattr(relax, "__name__", "unknown")
+    if not relax_name in relax_functions.keys():
+        raise ValueError("relax is not a valid relaxation function")
+
+    nodes = graph.nodes()
+    node_ids = {node: i for (i, node) in enumerate(nodes)}
+
+    if destinations == None:
+        destinations = nodes
+    tasks = [(node_ids[destination], relax_name) for destination in destinations]
+
+    result: Dict[Node, Dict[Node, Table]] = {}
+
+    memory = _share_graph(graph, node_ids)
+    try:
+        with Pool(processes, initializer=_init_worker, initargs=(memory.name,)) as pool:
+            for (destination, name, length) in pool.imap_unordered(_compute, tasks):
+                result[nodes[destination]] = _read_tables(name, length, nodes)
+    finally:
+        memory.close()
+        memory.unlink()
+
+    # in the order of `destinations`
+    return {nodes[destination]: result[nodes[destination]] for (destination, _) in tasks}
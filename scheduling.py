@@ -0,0 +1,141 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from collections import deque
+from heapq import heappop, heappush
+from math import inf
+from structures import Node
+from typing import TYPE_CHECKING, Deque, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from algorithm import Message
+
+class MessageScheduler(ABC):
+    """
+    Decides the order in which a `System` delivers the queued messages.
+    """
+    @abstractmethod
+    def push(self: MessageScheduler, message: Message) -> None:
+        ...
+
+    @abstractmethod
+    def pop(self: MessageScheduler) -> Message:
+        ...
+
+    @abstractmethod
+    def __len__(self: MessageScheduler) -> int:
+        ...
+
+class FifoScheduler(MessageScheduler):
+    """
+    Delivers messages in the order they were sent.
+    """
+    messages: Deque[Message]
+
+    def __init__(self: FifoScheduler):
+        self.messages = deque()
+
+    def push(self: FifoScheduler, message: Message) -> None:
+        self.messages.append(message)
+
+    def pop(self: FifoScheduler) -> Message:
+        return self.messages.popleft()
+
+    def __len__(self: FifoScheduler) -> int:
+        return len(self.messages)
+
+class LifoScheduler(MessageScheduler):
+    """
+    Delivers the most recently sent message first.
+    """
+    messages: List[Message]
+
+    def __init__(self: LifoScheduler):
+        self.messages = []
+
+    def push(self: LifoScheduler, message: Message) -> None:
+        self.messages.append(message)
+
+    def pop(self: LifoScheduler) -> Message:
+        return self.messages.pop()
+
+    def __len__(self: LifoScheduler) -> int:
+        return len(self.messages)
+
+class RoundRobinScheduler(MessageScheduler):
+    """
+    Keeps a queue of messages for every receiving router and delivers one message
+    to each router with waiting messages in turn.
+    """
+    queues: Dict[Node, Deque[Message]]
+    # routers with waiting messages, in the order they are served
+    ready: Deque[Node]
+    size: int
+
+    def __init__(self: RoundRobinScheduler):
+        self.queues = {}
+        self.ready = deque()
+        self.size = 0
+
+    def push(self: RoundRobinScheduler, message: Message) -> None:
+        queue = self.queues.get(message.to_node)
+        if queue == None:
+            queue = deque()
+            self.queues[message.to_node] = queue
+            self.ready.append(message.to_node)
+
+        queue.append(message)
+        self.size += 1
+
+    def pop(self: RoundRobinScheduler) -> Message:
+        router = self.ready.popleft()
+        queue = self.queues[router]
+        message = queue.popleft()
+
+        if queue:
+            self.ready.append(router)
+        else:
+            del self.queues[router]
+
+        self.size -= 1
+        return message
+
+    def __len__(self: RoundRobinScheduler) -> int:
+        return self.size
+
+class MaxTimePriorityScheduler(MessageScheduler):
+    """
+    Delivers the message with the smallest max time among its changes first,
+    messages with the same priority in the order they were sent.
+
+    The priority is taken when the message is sent, changes merged into a waiting message
+    (see `System.coalesce_messages`) do not change it.
+    """
+    messages: List[Tuple[float, int, Message]]
+    pushed: int
+
+    def __init__(self: MaxTimePriorityScheduler):
+        self.messages = []
+        self.pushed = 0
+
+    def push(self: MaxTimePriorityScheduler, message: Message) -> None:
+        changes = message.changes
+        priority = min(
+            (entry.max_time for entries in (changes.added, changes.removed) for entry in entries),
+            default=inf
+        )
+
+        heappush(self.messages, (priority, self.pushed, message))
+        self.pushed += 1
+
+    def pop(self: MaxTimePriorityScheduler) -> Message:
+        return heappop(self.messages)[2]
+
+    def __len__(self: MaxTimePriorityScheduler) -> int:
+        return len(self.messages)
+
+schedulers = {
+    "fifo": FifoScheduler,
+    "lifo": LifoScheduler,
+    "round_robin": RoundRobinScheduler,
+    "max_time_priority": MaxTimePriorityScheduler,
+}
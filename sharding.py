@@ -0,0 +1,358 @@
+from __future__ import annotations
+from algorithm import EdgeChangesReport, Message, Router, System
+from structures import Entry, Node, Edge, Graph, Table, TableDiff
+from tracing import Tracer
+from typing import Dict, List, Tuple
+from collections import deque
+from multiprocessing import Pipe, Process, Queue, cpu_count
+from multiprocessing.connection import Connection
+import math
+import traceback
+
+def partition_graph(graph: Graph, parts: int, imbalance: float = 0.05) -> Dict[Node, int]:
+    """
+    Assigns every node of the graph to one of `parts` parts of roughly equal size,
+    keeping neighboring nodes in the same part where possible.
+
+    The nodes are split into consecutive chunks of a breadth first order (ignoring edge directions),
+    then every node is moved once to the part most of its neighbors are in, as long as no part
+    grows beyond `1 + imbalance` times the average part size.
+    """
+    nodes = graph.nodes()
+    if parts < 1:
+        raise ValueError("`parts` should be at least 1")
+
+    neighbors: Dict[Node, List[Node]] = {}
+    for node in nodes:
+        neighbors[node] = list(set(graph.successors(node)) | set(graph.predecessors(node)))
+
+    order: List[Node] = []
+    visited = set()
+    for start in nodes:
+        if start in visited:
+            continue
+
+        visited.add(start)
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for neighbor in neighbors[node]:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    queue.append(neighbor)
+
+    chunk_size = max(math.ceil(len(nodes) / parts), 1)
+    part_of = {node: i // chunk_size for (i, node) in enumerate(order)}
+
+    sizes = [0] * parts
+    for part in part_of.values():
+        sizes[part] += 1
+
+    capacity = math.ceil(len(nodes) / parts * (1 + imbalance))
+    for node in order:
+        part = part_of[node]
+
+        counts: Dict[int, int] = {}
+        for neighbor in neighbors[node]:
+            counts[part_of[neighbor]] = counts.get(part_of[neighbor], 0) + 1
+
+        best = part
+        for (other, count) in counts.items():
+            if counts.get(best, 0) < count and sizes[other] < capacity:
+                best = other
+
+        if best != part:
+            sizes[part] -= 1
+            sizes[best] += 1
+            part_of[node] = best
+
+    return part_of
+
+class _Shard:
+    """
+    The routers of one worker process, it takes the place of the `System` of its routers.
+    """
+    index: int
+    routers: Dict[Node, Router]
+    part_of: Dict[Node, int]
+    tracer: Tracer
+    path_length_limit: int
+    # (index of the message or action being processed, message) of the messages sent in the current step
+    outgoing: List[Tuple[int, Message]]
+    current: int
+
+    is_considered = System.is_considered
+
+    def __init__(
+        self: _Shard,
+        index: int,
+        incoming_edges: Dict[Node, List[Edge]],
+        part_of: Dict[Node, int],
+        path_length_limit: int
+    ):
+        self.index = index
+        self.part_of = part_of
+        self.tracer = Tracer()
+        self.path_length_limit = path_length_limit
+        self.outgoing = []
+        self.current = 0
+
+        self.routers = {}
+        for (node, edges) in incoming_edges.items():
+            self.routers[node] = Router(self, node, edges)
+
+    def send(self: _Shard, message: Message):
+        self.outgoing.append((self.current, message))
+
+def _run_shard(
+    shard: _Shard,
+    actions: List[Tuple[int, Tuple]],
+    connection: Connection,
+    inboxes: List[Queue]
+):
+    """
+    Runs one propagation in supersteps.
+
+    Every step delivers the messages sent in the previous step (the first step performs the `actions`)
+    ordered by their index. A message sent while processing message (or action) `i` as the `k`th
+    message sent for it gets the index `offsets[i] + k`, where the offsets are the prefix sums of the
+    number of messages sent for every message of the step in all shards, which the coordinator
+    computes. These indices are the positions the messages have in the queue of a single `System`,
+    so the routers see the messages in the same order as there.
+    """
+    step: List[Tuple[int, object]] = actions
+    first = True
+
+    while True:
+        shard.outgoing = []
+        for (index, item) in step:
+            shard.current = index
+            if first:
+                (kind, *args) = item
+                if kind == "send":
+                    shard.send(args[0])
+                else:
+                    (node, edges) = args
+                    shard.routers[node].update_incoming_edges(edges)
+            else:
+                shard.routers[item.to_node].send(item)
+        first = False
+
+        counts: Dict[int, int] = {}
+        for (index, _) in shard.outgoing:
+            counts[index] = counts.get(index, 0) + 1
+        connection.send(("counts", list(counts.items())))
+
+        offsets = connection.recv()
+        if offsets == None:
+            return
+
+        offsets = dict(zip(counts.keys(), offsets))
+        batches: List[List[Tuple[int, Message]]] = [[] for _ in inboxes]
+        for (index, message) in shard.outgoing:
+            batches[shard.part_of[message.to_node]].append((offsets[index], message))
+            offsets[index] += 1
+
+        for (i, batch) in enumerate(batches):
+            if i != shard.index:
+                inboxes[i].put(batch)
+
+        step = batches[shard.index]
+        for _ in range(len(inboxes) - 1):
+            step.extend(inboxes[shard.index].get())
+        step.sort(key=lambda item: item[0])
+
+def _worker(
+    index: int,
+    incoming_edges: Dict[Node, List[Edge]],
+    part_of: Dict[Node, int],
+    path_length_limit: int,
+    connection: Connection,
+    inboxes: List[Queue]
+):
+    shard = _Shard(index, incoming_edges, part_of, path_length_limit)
+
+    try:
+        while True:
+            (command, *args) = connection.recv()
+            if command == "run":
+                _run_shard(shard, args[0], connection, inboxes)
+                connection.send(("done",))
+            elif command == "update":
+                (node, edges) = args
+                shard.outgoing = []
+                shard.routers[node].update_incoming_edges(edges)
+                connection.send(("messages", [message for (_, message) in shard.outgoing]))
+            elif command == "tables":
+                connection.send(("tables", {node: router.table for (node, router) in shard.routers.items()}))
+            elif command == "close":
+                return
+    except Exception:
+        connection.send(("error", traceback.format_exc()))
+
+class ShardedSystem:
+    """
+    A `System` whose routers are partitioned across `shards` worker processes (the number of CPUs by default).
+
+    The propagation runs in steps, in each step every shard delivers the messages of its routers sent in
+    the previous step, messages to routers of other shards are exchanged in one batch per pair of shards
+    through queues. The propagation is finished when a step sends no messages.
+
+    The messages are delivered in the same order as by a `System` with its default FIFO scheduler,
+    so the tables and the message counts are the same.
+    """
+    graph: Graph
+    destination: Node
+    part_of: Dict[Node, int]
+    processes: List[Process]
+    connections: List[Connection]
+    messages_sent: int
+    messages_delivered: int
+
+    def __init__(self: ShardedSystem, graph: Graph, destination: Node, shards: int | None = None):
+        self.graph = graph
+        self.destination = destination
+
+        nodes = graph.nodes()
+        if shards == None:
+            shards = cpu_count()
+        shards = max(min(shards, len(nodes)), 1)
+
+        self.part_of = partition_graph(graph, shards)
+
+        incoming_edges: List[Dict[Node, List[Edge]]] = [{} for _ in range(shards)]
+        for node in nodes:
+            incoming_edges[self.part_of[node]][node] = graph.incoming_edges(node)
+
+        inboxes = [Queue() for _ in range(shards)]
+        self.processes = []
+        self.connections = []
+        for i in range(shards):
+            (connection, worker_connection) = Pipe()
+            process = Process(
+                target=_worker,
+                args=(i, incoming_edges[i], self.part_of, len(nodes) - 1, worker_connection, inboxes),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+            self.connections.append(connection)
+
+        self.messages_sent = 0
+        self.messages_delivered = 0
+
+        diff = TableDiff(Table(), Table(set([Entry(0, [], 0)])))
+        self._run([("send", Message(None, destination, diff))], [destination])
+
+    def _receive(self: ShardedSystem, connection: Connection) -> Tuple:
+        result = connection.recv()
+        if result[0] == "error":
+            self.close()
+            raise RuntimeError(f"shard failed:\n{result[1]}")
+        return result
+
+    def _run(self: ShardedSystem, actions: List[Tuple], nodes: List[Node]):
+        """
+        Performs the `actions`, the `i`th of them at the router `nodes[i]`, and propagates the messages they send.
+        """
+        shard_actions: List[List[Tuple[int, Tuple]]] = [[] for _ in self.connections]
+        for (i, (action, node)) in enumerate(zip(actions, nodes)):
+            shard_actions[self.part_of[node]].append((i, action))
+
+        for (connection, actions) in zip(self.connections, shard_actions):
+            connection.send(("run", actions))
+
+        while True:
+            shard_counts = [self._receive(connection)[1] for connection in self.connections]
+
+            total = sum(count for counts in shard_counts for (_, count) in counts)
+            if total == 0:
+                for connection in self.connections:
+                    connection.send(None)
+                break
+
+            self.messages_sent += total
+            self.messages_delivered += total
+
+            offsets: Dict[int, int] = {}
+            for counts in shard_counts:
+                offsets.update(counts)
+            offset = 0
+            for index in sorted(offsets.keys()):
+                (offsets[index], offset) = (offset, offset + offsets[index])
+
+            for (connection, counts) in zip(self.connections, shard_counts):
+                connection.send([offsets[index] for (index, _) in counts])
+
+        for connection in self.connections:
+            self._receive(connection)
+
+    def simulate_edge_change(self: ShardedSystem, edge: Tuple[Node, Node], new_expected_delay: int):
+        (u, v) = edge
+        self.graph.modify_edge_weights(u, v, new_expected_delay=new_expected_delay)
+
+        self.messages_sent = 0
+        self.messages_delivered = 0
+
+        # a `System` propagates each message sent by the router detecting the change
+        # completely before the router sends the next one
+        connection = self.connections[self.part_of[v]]
+        connection.send(("update", v, self.graph.incoming_edges(v)))
+        for message in self._receive(connection)[1]:
+            self._run([("send", message)], [message.to_node])
+
+    def simulate_edge_changes(self: ShardedSystem, changes: List[Tuple[Tuple[Node, Node], int]]) -> EdgeChangesReport:
+        """
+        Applies several edge changes at once, see `System.simulate_edge_changes`.
+        """
+        # nothing is modified unless every change is valid
+        for ((u, v), _) in changes:
+            if u not in self.graph.data or v not in self.graph.data[u]:
+                raise ValueError(f"there is no edge ({u}, {v}) in the graph")
+
+        affected_routers: List[Node] = []
+        for ((u, v), new_expected_delay) in changes:
+            self.graph.modify_edge_weights(u, v, new_expected_delay=new_expected_delay)
+            if v not in affected_routers:
+                affected_routers.append(v)
+
+        self.messages_sent = 0
+        self.messages_delivered = 0
+
+        actions = [("update", v, self.graph.incoming_edges(v)) for v in affected_routers]
+        self._run(actions, affected_routers)
+
+        return EdgeChangesReport(self.messages_sent, self.messages_delivered)
+
+    def tables(self: ShardedSystem) -> Dict[Node, Table]:
+        result = {}
+        for connection in self.connections:
+            connection.send(("tables",))
+        for connection in self.connections:
+            result.update(self._receive(connection)[1])
+
+        return {node: result[node] for node in self.graph.nodes()}
+
+    def close(self: ShardedSystem):
+        """
+        Stops the worker processes.
+        """
+        for (connection, process) in zip(self.connections, self.processes):
+            if process.is_alive():
+                try:
+                    connection.send(("close",))
+                except (BrokenPipeError, OSError):
+                    pass
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+
+        self.connections = []
+        self.processes = []
+
+    def __enter__(self: ShardedSystem) -> ShardedSystem:
+        return self
+
+    def __exit__(self: ShardedSystem, *args):
+        self.close()
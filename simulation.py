@@ -0,0 +1,181 @@
+from __future__ import annotations
+from algorithm import Message, System
+from heapq import heappop, heappush
+from scheduling import MessageScheduler
+from structures import Node, Graph
+from tracing import Tracer
+from typing import Dict, List, Tuple
+import random
+
+class ConvergenceReport:
+    # virtual time between the start of the simulation and the end of the last message processing
+    convergence_time: float
+    # virtual time at which every router that received a message finished processing its last message
+    last_update: Dict[Node, float]
+    # the largest number of messages sent but not yet processed at the same time
+    peak_in_flight: int
+    messages_sent: int
+    messages_delivered: int
+
+    def __init__(
+        self: ConvergenceReport,
+        convergence_time: float,
+        last_update: Dict[Node, float],
+        peak_in_flight: int,
+        messages_sent: int,
+        messages_delivered: int
+    ):
+        self.convergence_time = convergence_time
+        self.last_update = last_update
+        self.peak_in_flight = peak_in_flight
+        self.messages_sent = messages_sent
+        self.messages_delivered = messages_delivered
+
+    def __str__(self: ConvergenceReport):
+        return (
+            f"ConvergenceReport: time {self.convergence_time:.3f} routers updated {len(self.last_update)} "
+            f"peak in flight {self.peak_in_flight} messages {self.messages_sent}"
+        )
+
+class EventScheduler(MessageScheduler):
+    """
+    Delivers messages in the order of a virtual clock.
+
+    A message sent by a router arrives after the delay of the link it travels on, the expected delay
+    of the edge from the receiving router to the sending router, or a delay sampled uniformly between
+    the expected and the worst case delay if `sample_delays` is set. Links deliver in the order the
+    messages were sent, a message never arrives before an earlier message on its link, so the diffs
+    are applied in order even when their sampled delays would reorder them. A router processes the arrived
+    messages one at a time in arrival order, each taking `processing_cost`, and the messages it sends
+    leave when the processing is finished.
+    """
+    graph: Graph
+    processing_cost: float
+    sample_delays: bool
+    random: random.Random
+    # (arrival time, send order, message)
+    events: List[Tuple[float, int, Message]]
+    pushed: int
+    # virtual time at which the messages being sent leave the sending router
+    send_time: float
+    # virtual time at which the last processing finished
+    finish_time: float
+    # virtual time until which a router is processing messages
+    busy_until: Dict[Node, float]
+    # arrival time of the last message sent on every (from node, to node) link
+    link_arrival: Dict[Tuple[Node, Node], float]
+    last_update: Dict[Node, float]
+    peak_in_flight: int
+
+    def __init__(self: EventScheduler, graph: Graph, processing_cost: float = 0.0, sample_delays: bool = False, seed: int | None = None):
+        if processing_cost < 0:
+            raise ValueError("`processing_cost` should not be negative")
+
+        self.graph = graph
+        self.processing_cost = processing_cost
+        self.sample_delays = sample_delays
+        self.random = random.Random(seed)
+        self.events = []
+        self.pushed = 0
+        self.send_time = 0.0
+        self.finish_time = 0.0
+        self.busy_until = {}
+        self.link_arrival = {}
+        self.last_update = {}
+        self.peak_in_flight = 0
+
+    def start(self: EventScheduler):
+        """
+        Starts a new measurement at the time the previous activity finished.
+        """
+        self.send_time = self.finish_time
+        self.last_update = {}
+        self.peak_in_flight = len(self.events)
+
+    def link_delay(self: EventScheduler, message: Message) -> float:
+        if message.from_node == None:
+            return 0.0
+
+        edge = self.graph.edge(message.to_node, message.from_node)
+        if self.sample_delays:
+            return self.random.randint(edge.expected_delay, edge.worst_case_delay)
+        return edge.expected_delay
+
+    def push(self: EventScheduler, message: Message) -> None:
+        arrival = self.send_time + self.link_delay(message)
+        if message.from_node != None:
+            link = (message.from_node, message.to_node)
+            arrival = max(arrival, self.link_arrival.get(link, arrival))
+            self.link_arrival[link] = arrival
+
+        heappush(self.events, (arrival, self.pushed, message))
+        self.pushed += 1
+        self.peak_in_flight = max(self.peak_in_flight, len(self.events))
+
+    def pop(self: EventScheduler) -> Message:
+        (arrival, _, message) = heappop(self.events)
+
+        router = message.to_node
+        finish = max(arrival, self.busy_until.get(router, arrival)) + self.processing_cost
+        self.busy_until[router] = finish
+        self.last_update[router] = finish
+
+        self.send_time = finish
+        self.finish_time = max(self.finish_time, finish)
+
+        return message
+
+    def __len__(self: EventScheduler) -> int:
+        return len(self.events)
+
+class ConvergenceSimulator:
+    """
+    Runs a `System` on the virtual clock of an `EventScheduler` to measure convergence in network time.
+    """
+    system: System
+    scheduler: EventScheduler
+    # the report of the calculation of the initial tables
+    initial_report: ConvergenceReport
+
+    def __init__(
+        self: ConvergenceSimulator,
+        graph: Graph,
+        destination: Node,
+        processing_cost: float = 0.0,
+        sample_delays: bool = False,
+        seed: int | None = None,
+        tracer: Tracer | None = None,
+        coalesce_messages: bool = False
+    ):
+        self.scheduler = EventScheduler(graph, processing_cost, sample_delays, seed)
+        self.system = System(graph, destination, tracer, coalesce_messages, self.scheduler)
+        self.initial_report = self._report(0.0)
+
+    def simulate_edge_change(self: ConvergenceSimulator, edge: Tuple[Node, Node], new_expected_delay: int) -> ConvergenceReport:
+        start = self._start()
+        self.system.simulate_edge_change(edge, new_expected_delay)
+        return self._report(start)
+
+    def simulate_edge_changes(self: ConvergenceSimulator, changes: List[Tuple[Tuple[Node, Node], int]]) -> ConvergenceReport:
+        """
+        Applies several edge changes at the same virtual time, see `System.simulate_edge_changes`.
+        """
+        start = self._start()
+        self.system.simulate_edge_changes(changes)
+        return self._report(start)
+
+    def _start(self: ConvergenceSimulator) -> float:
+        self.scheduler.start()
+        return self.scheduler.send_time
+
+    def _report(self: ConvergenceSimulator, start: float) -> ConvergenceReport:
+        scheduler = self.scheduler
+        last_update = {router: time - start for (router, time) in scheduler.last_update.items()}
+
+        return ConvergenceReport(
+            max(scheduler.finish_time - start, 0.0),
+            last_update,
+            scheduler.peak_in_flight,
+            self.system.messages_sent,
+            self.system.messages_delivered
+        )
@@ -0,0 +1,191 @@
+from __future__ import annotations
+from algorithm import System
+from structures import Node
+from typing import Callable, Dict, Iterable, Iterator, Tuple
+import time
+
+class DelayUpdate:
+    edge: Tuple[Node, Node]
+    expected_delay: int
+    timestamp: float
+
+    def __init__(self: DelayUpdate, edge: Tuple[Node, Node], expected_delay: int, timestamp: float):
+        self.edge = edge
+        self.expected_delay = expected_delay
+        self.timestamp = timestamp
+
+    def __str__(self: DelayUpdate):
+        return f"DelayUpdate: {self.edge} {self.expected_delay} {self.timestamp}"
+
+def _parse_node(text: str) -> Node:
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+def read_delay_updates(lines: Iterable[str]) -> Iterator[DelayUpdate]:
+    """
+    Reads updates from lines of the form `u v expected_delay timestamp`, for example an open file.
+    Empty lines and lines starting with `#` are skipped.
+    """
+    for line in lines:
+        line = line.strip()
+        if len(line) == 0 or line.startswith("#"):
+            continue
+
+        parts = line.split()
+        if len(parts) != 4:
+            raise ValueError(f"a delay update should have 4 fields: {line}")
+
+        (u, v, expected_delay, timestamp) = parts
+        yield DelayUpdate((_parse_node(u), _parse_node(v)), int(expected_delay), float(timestamp))
+
+class StreamMetrics:
+    updates_received: int
+    # updates replaced by a later update of the same edge in the same epoch
+    updates_superseded: int
+    updates_applied: int
+    epochs: int
+    messages_sent: int
+    messages_delivered: int
+    # seconds spent applying epochs to the system
+    busy_time: float
+    # seconds between the timestamp of the first update of an epoch and the end of its processing
+    last_lag: float
+    max_lag: float
+
+    def __init__(self: StreamMetrics):
+        self.updates_received = 0
+        self.updates_superseded = 0
+        self.updates_applied = 0
+        self.epochs = 0
+        self.messages_sent = 0
+        self.messages_delivered = 0
+        self.busy_time = 0.0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    @property
+    def throughput(self: StreamMetrics) -> float:
+        """
+        Received updates per second of processing.
+        """
+        if self.busy_time == 0:
+            return 0.0
+        return self.updates_received / self.busy_time
+
+    def __str__(self: StreamMetrics):
+        return (
+            f"StreamMetrics: received {self.updates_received} superseded {self.updates_superseded} "
+            f"applied {self.updates_applied} epochs {self.epochs} messages {self.messages_sent} "
+            f"throughput {self.throughput:.1f}/s lag {self.last_lag:.3f}s (max {self.max_lag:.3f}s)"
+        )
+
+class DelayUpdateStream:
+    """
+    Feeds a stream of delay updates to a `System` in epochs.
+
+    An epoch ends after `max_epoch_updates` updates or once `max_epoch_duration` seconds passed since
+    the timestamp of its first update, either by the `clock` or by the timestamp of a later update,
+    which then starts the next epoch. Only the last update of every edge in an epoch is kept and the
+    epoch is applied with `System.simulate_edge_changes`.
+
+    Updates are pulled from the source only while the current epoch is being filled, so at most one
+    epoch is buffered and a slow system slows down reading instead of growing a queue. A live source
+    can yield `None` when no update arrived for a while, the stream then checks the `clock` and applies
+    an expired epoch without waiting for the next update. The lag is measured with the `clock` too,
+    it should use the same time base as the update timestamps. Without a `clock` the time is the
+    newest timestamp seen so far, which suits replaying recorded updates, for example from
+    `read_delay_updates`, a live source should pass its clock (e.g. `time.time`).
+    """
+    system: System
+    max_epoch_updates: int
+    max_epoch_duration: float | None
+    clock: Callable[[], float] | None
+    # the newest update timestamp seen, the time if there is no `clock`
+    latest_timestamp: float
+    metrics: StreamMetrics
+
+    def __init__(
+        self: DelayUpdateStream,
+        system: System,
+        max_epoch_updates: int = 64,
+        max_epoch_duration: float | None = None,
+        clock: Callable[[], float] | None = None
+    ):
+        if max_epoch_updates < 1:
+            raise ValueError("`max_epoch_updates` should be at least 1")
+
+        self.system = system
+        self.max_epoch_updates = max_epoch_updates
+        self.max_epoch_duration = max_epoch_duration
+        self.clock = clock
+        self.latest_timestamp = 0.0
+        self.metrics = StreamMetrics()
+
+    def run(self: DelayUpdateStream, updates: Iterable[DelayUpdate | None]) -> StreamMetrics:
+        """
+        Processes all `updates` and returns the metrics of the stream, `None` items only check
+        whether the current epoch expired.
+        """
+        epoch: Dict[Tuple[Node, Node], DelayUpdate] = {}
+        epoch_size = 0
+        epoch_start = 0.0
+
+        for update in updates:
+            if 0 < epoch_size and self._expired(epoch_start, update):
+                self._apply_epoch(epoch, epoch_start)
+                epoch = {}
+                epoch_size = 0
+
+            if update == None:
+                continue
+
+            self.latest_timestamp = max(self.latest_timestamp, update.timestamp)
+            if epoch_size == 0:
+                epoch_start = update.timestamp
+
+            self.metrics.updates_received += 1
+            if update.edge in epoch:
+                self.metrics.updates_superseded += 1
+            epoch[update.edge] = update
+            epoch_size += 1
+
+            if self.max_epoch_updates <= epoch_size:
+                self._apply_epoch(epoch, epoch_start)
+                epoch = {}
+                epoch_size = 0
+
+        if 0 < epoch_size:
+            self._apply_epoch(epoch, epoch_start)
+
+        return self.metrics
+
+    def _expired(self: DelayUpdateStream, epoch_start: float, update: DelayUpdate | None) -> bool:
+        if self.max_epoch_duration == None:
+            return False
+
+        if update != None and self.max_epoch_duration <= update.timestamp - epoch_start:
+            return True
+        return self.max_epoch_duration <= self._now() - epoch_start
+
+    def _now(self: DelayUpdateStream) -> float:
+        if self.clock == None:
+            return self.latest_timestamp
+        return self.clock()
+
+    def _apply_epoch(self: DelayUpdateStream, epoch: Dict[Tuple[Node, Node], DelayUpdate], epoch_start: float):
+        changes = [(edge, update.expected_delay) for (edge, update) in epoch.items()]
+
+        start = time.perf_counter()
+        report = self.system.simulate_edge_changes(changes)
+        self.metrics.busy_time += time.perf_counter() - start
+
+        self.metrics.epochs += 1
+        self.metrics.updates_applied += len(changes)
+        self.metrics.messages_sent += report.messages_sent
+        self.metrics.messages_delivered += report.messages_delivered
+
+        lag = self._now() - epoch_start
+        self.metrics.last_lag = lag
+        self.metrics.max_lag = max(self.metrics.max_lag, lag)
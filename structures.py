@@ -1,19 +1,85 @@
 from __future__ import annotations
-from typing import List, Tuple, Dict, Mapping, Set
+from typing import List, Tuple, Dict, Mapping, Set, FrozenSet, Sequence, Callable, Iterable
+from bisect import bisect_left, bisect_right
+from math import inf
+from weakref import KeyedRef
 
 Node = int | str
 
+# table fingerprints are sums of entry hashes modulo 2^64
+FINGERPRINT_MASK = (1 << 64) - 1
+
+class NodeInterner:
+    """
+    Maps node labels to dense integer ids (0, 1, 2, ...) and back.
+    """
+    ids: Dict[Node, int]
+    labels: List[Node]
+
+    def __init__(self: NodeInterner, labels: Iterable[Node] = ()):
+        self.ids = {}
+        self.labels = []
+
+        for label in labels:
+            self.intern(label)
+
+    def intern(self: NodeInterner, label: Node) -> int:
+        """
+        Returns the id of `label`, assigning the next free id if it has none yet.
+        """
+        node_id = self.ids.get(label)
+        if node_id == None:
+            node_id = self.ids[label] = len(self.labels)
+            self.labels.append(label)
+        return node_id
+
+    def id(self: NodeInterner, label: Node) -> int:
+        return self.ids[label]
+
+    def label(self: NodeInterner, node_id: int) -> Node:
+        return self.labels[node_id]
+
+    def labelled_entry(self: NodeInterner, entry: Entry) -> Entry:
+        """
+        Returns a copy of `entry` with the node ids of its parents replaced by their labels.
+        """
+        return Entry(entry.max_time, [self.labels[node] for node in entry.parents], entry.expected_time)
+
+    def labelled_tables(self: NodeInterner, tables: Mapping[int, Table]) -> Dict[Node, Table]:
+        """
+        Returns the `tables` keyed by and referring to node labels instead of node ids.
+        """
+        result = {}
+        for (node, table) in tables.items():
+            result[self.labels[node]] = Table(set(self.labelled_entry(entry) for entry in table))
+        return result
+
+    def __len__(self: NodeInterner):
+        return len(self.labels)
+
 class Edge:
+    __slots__ = ("from_node", "to_node", "expected_delay", "worst_case_delay", "bits")
+
     from_node: Node
     to_node: Node
     expected_delay: int
     worst_case_delay: int
+    # the node bits of the graph of the edge, `None` for edges that do not belong to a graph
+    bits: NodeInterner | None
 
-    def __init__(self: Edge, from_node: Node, to_node: Node, expected_delay: int, worst_case_delay: int):
+    def __init__(
+        self: Edge, 
+        from_node: Node, 
+        to_node: Node, 
+        expected_delay: int, 
+        worst_case_delay: int, 
+        bits: NodeInterner | None = None
+    ):
         self.from_node = from_node
         self.to_node = to_node
         self.expected_delay = expected_delay
         self.worst_case_delay = worst_case_delay
+        self.bits = bits
 
     def other_side(self: Edge, node: Node) -> Node:
         """
@@ -48,24 +114,85 @@ class Edge:
 
 class Graph:
     data: Dict[Node, Dict[Node, Tuple[int, int]]]
+    reverse_data: Dict[Node, Dict[Node, Tuple[int, int]]]
+    interner: NodeInterner | None
+    bits: NodeInterner
+    version: int
+    _edge_cache: Dict[Tuple[Node, Node], Edge]
+    _edges: Set[Edge] | None
 
-    def __init__(self: Graph, adjacency_list: Mapping[Node, Mapping[Node, Tuple[int, int]]]):
+    def __init__(self: Graph, adjacency_list: Mapping[Node, Mapping[Node, Tuple[int, int]]], intern_nodes: bool = False):
         """
         Constructs a new graph.
 
         The graph maps a node to its neighboring nodes and their respective
         edge weights (expected delay, worst-case delay).
+
+        Besides the forward adjacency (`data`) the graph maintains a reverse
+        adjacency (`reverse_data`) mapping a node to its predecessors, and a cache
+        of `Edge` objects, so neighborhood lookups are proportional to the degree
+        of the node instead of the size of the graph.
+
+        If `intern_nodes` is set the nodes of the graph are dense integer ids instead of
+        the labels used in `adjacency_list`, `interner` maps between the two. Interning does
+        not make tables smaller, entries refer to the same label objects either way.
+
+        Every node of the graph is assigned a bit by `bits`, the edges of the graph carry
+        them, so paths built along the edges keep a bitset of their nodes (see `Path`).
         """
         self.data = {}
+        self.reverse_data = {}
+        self.interner = None
+        self.version = 0
+        self._edge_cache = {}
+        self._edges = None
+
+        if intern_nodes:
+            interner = NodeInterner(adjacency_list.keys())
+            for edges in adjacency_list.values():
+                for v in edges.keys():
+                    interner.intern(v)
+
+            adjacency_list = {
+                interner.id(u): {interner.id(v): weights for (v, weights) in edges.items()}
+                for (u, edges) in adjacency_list.items()
+            }
+            self.interner = interner
+
+        for u in adjacency_list.keys():
+            self.reverse_data[u] = {}
 
         for (u, edges) in adjacency_list.items():
             self.data[u] = {}
             for (v, edge_weights) in edges.items():
                 self.data[u][v] = edge_weights
+                self.reverse_data.setdefault(v, {})[u] = edge_weights
+
+        self.bits = NodeInterner(self.reverse_data.keys())
+
+    def node_id(self: Graph, label: Node) -> Node:
+        """
+        Returns the node of the graph for a node `label`, only differs from the label if nodes are interned.
+        """
+        if self.interner == None:
+            return label
+        return self.interner.id(label)
+
+    def label(self: Graph, node: Node) -> Node:
+        """
+        Returns the label of a `node` of the graph, only differs from the node if nodes are interned.
+        """
+        if self.interner == None:
+            return node
+        return self.interner.label(node)
 
     def edge(self: Graph, u: Node, v: Node) -> Edge:
-        weights = self.data[u][v]
-        return Edge(u, v, *weights)
+        edge = self._edge_cache.get((u, v))
+        if edge == None:
+            weights = self.data[u][v]
+            edge = Edge(u, v, *weights, self.bits)
+            self._edge_cache[(u, v)] = edge
+        return edge
 
     def modify_edge_weights(
         self: Graph, 
@@ -82,47 +209,45 @@ class Graph:
             new_worst_case_delay = current_worst_case_delay
 
         self.data[u][v] = (new_expected_delay, new_worst_case_delay)
+        self.reverse_data[v][u] = (new_expected_delay, new_worst_case_delay)
+
+        # cached edges are replaced rather than mutated, holders of the old `Edge` 
+        # (e.g. a router comparing its previous incoming edges) keep seeing the old weights
+        self._edge_cache.pop((u, v), None)
+        self._edges = None
+        self.version += 1
     
     def nodes(self: Graph) -> List[Node]:
         return list(self.data.keys())
     
     def edges(self: Graph) -> Set[Edge]:
-        edges: Set[Edge] = set()
+        """
+        Returns the set of all edges of the graph.
+
+        The set is cached until the next modification of the graph and must not be mutated by the caller.
+        """
+        if self._edges == None:
+            edges: Set[Edge] = set()
 
-        for (node, neighbors) in self.data.items():
-            for (neighbor, weights) in neighbors.items():
-                edges.add(Edge(node, neighbor, *weights))
+            for (node, neighbors) in self.data.items():
+                for neighbor in neighbors.keys():
+                    edges.add(self.edge(node, neighbor))
 
-        return edges
+            self._edges = edges
 
-    def successors(self: Graph, node: Node) -> List[Node]:
-        neighbors = []
-        for neighbor in self.data[node].keys():
-            neighbors.append(neighbor)
+        return self._edges
 
-        return neighbors
+    def successors(self: Graph, node: Node) -> List[Node]:
+        return list(self.data[node].keys())
     
     def predecessors(self: Graph, node: Node) -> List[Node]:
-        result = []
-        for (u, edges) in self.data.items():
-            if node in edges.keys():
-                result.append(u)
-        return result
-        
+        return list(self.reverse_data.get(node, {}).keys())
     
     def outgoing_edges(self: Graph, node: Node) -> List[Edge]:
-        result = []
-        for (node, edges) in self.data.items():
-            for (v, weights) in edges.items():
-                result.append(Edge(node, v, *weights))
-        return result
+        return [self.edge(node, v) for v in self.data[node].keys()]
     
     def incoming_edges(self: Graph, node: Node) -> List[Edge]:
-        result = []
-        for (u, edges) in self.data.items():
-            if node in edges.keys():
-                result.append(Edge(u, node, *edges[node]))
-        return result
+        return [self.edge(u, node) for u in self.reverse_data.get(node, {}).keys()]
     
     def __str__(self: Graph):
         result = ""
@@ -135,21 +260,211 @@ class Graph:
                 
         return result 
 
+class Path:
+    """
+    An immutable sequence of nodes stored as a linked list.
+
+    Paths are only ever extended at the front, so a path shares its tail with the path it was 
+    extended from. Paths are interned by their hash, so there is usually one `Path` object for 
+    a sequence of nodes. A path whose hash collides with a different live path is not interned,
+    equal paths that are different objects are compared node by node up to their shared tail.
+
+    If every node of the path was prepended with the node bits of the same graph (the `bits`
+    of its edges), the path keeps a bitset of its nodes and checking whether a node is on the
+    path takes constant time, otherwise the path is walked. The bitset is only meaningful for
+    the bits it was built with, graphs with the same node labels get separate `Path` objects,
+    the path built last is the interned one.
+    """
+    __slots__ = ("head", "tail", "length", "mask", "bits", "_hash", "__weakref__")
+
+    head: Node | None
+    tail: Path | None
+    length: int
+    # bitset of the nodes, `None` if a node was prepended without the bits of the graph
+    mask: int | None
+    # the node bits the mask refers to
+    bits: NodeInterner | None
+    _hash: int
+
+    # maps the hash of a path to a weak reference to the path, the key is the `_hash` of the 
+    # path itself, so the table costs no objects besides the reference
+    _interned: Dict[int, KeyedRef] = {}
+    EMPTY: Path
+
+    def __init__(self: Path, head: Node | None, tail: Path | None, bits: NodeInterner | None = None):
+        """
+        Should not be called directly, use `Path.EMPTY`, `Path.of` or `prepend` instead.
+        """
+        self.head = head
+        self.tail = tail
+        self.mask = None
+        self.bits = None
+
+        if tail == None:
+            self.length = 0
+            self.mask = 0
+            self._hash = hash(())
+        else:
+            self.length = tail.length + 1
+            self._hash = hash((head, tail._hash))
+
+            if bits != None and tail.mask != None and (tail.bits is bits or tail.length == 0):
+                bit = bits.ids.get(head)
+                if bit != None:
+                    self.mask = tail.mask | (1 << bit)
+                    self.bits = bits
+
+    @staticmethod
+    def of(nodes: Sequence[Node] | Path) -> Path:
+        """
+        Returns the path consisting of `nodes`.
+        """
+        if type(nodes) == Path:
+            return nodes
+
+        path = Path.EMPTY
+        for node in reversed(nodes):
+            path = path.prepend(node)
+        return path
+
+    def prepend(self: Path, node: Node, bits: NodeInterner | None = None) -> Path:
+        """
+        Returns the path starting with `node` followed by this path.
+
+        If `bits` of the graph are provided the path keeps a bitset of its nodes if this path does.
+        """
+        reference = Path._interned.get(hash((node, self._hash)))
+        interned = None if reference == None else reference()
+        if interned != None and interned.tail is self and interned.head == node:
+            # a path of another graph is only replaced if the new path could keep a bitset
+            if bits == None or interned.bits is bits or not (self.bits is bits or self.length == 0):
+                return interned
+
+        path = Path(node, self, bits)
+        if interned == None or interned.head == node and interned.tail == self:
+            Path._interned[path._hash] = KeyedRef(path, Path._forget, path._hash)
+        return path
+
+    @staticmethod
+    def _forget(reference: KeyedRef) -> None:
+        if Path._interned.get(reference.key) is reference:
+            del Path._interned[reference.key]
+
+    def __contains__(self: Path, node: object):
+        if self.bits != None:
+            bit = self.bits.ids.get(node)
+            return bit != None and (self.mask >> bit) & 1 == 1
+
+        path = self
+        while path.length != 0:
+            if path.head == node:
+                return True
+            path = path.tail
+        return False
+
+    def __iter__(self: Path):
+        path = self
+        while path.length != 0:
+            yield path.head
+            path = path.tail
+
+    def __len__(self: Path):
+        return self.length
+
+    def __eq__(self: Path, other: object):
+        if self is other:
+            return True
+        if type(other) != Path or self._hash != other._hash or self.length != other.length:
+            return False
+
+        path = self
+        while path is not other:
+            if path.head != other.head:
+                return False
+            (path, other) = (path.tail, other.tail)
+        return True
+
+    def __hash__(self: Path):
+        return self._hash
+
+    def __copy__(self: Path) -> Path:
+        return self
+
+    def __deepcopy__(self: Path, memo: Dict) -> Path:
+        return self
+
+    def __reduce__(self: Path):
+        return (Path.of, (list(self),))
+
+    def __str__(self: Path):
+        return str(list(self))
+
+    def __repr__(self: Path):
+        return str(self)
+
+Path.EMPTY = Path(None, None)
+
+class PathWriter:
+    """
+    Writes paths as (head, tail reference) pairs, every path after its tail, so paths with a common
+    suffix share it and a reader can rebuild each path from the ones before it.
+
+    The empty path has the reference `empty_ref`, the `i`th path written the reference `empty_ref + 1 + i`.
+    """
+    empty_ref: int
+    # (head, tail reference) of the paths written
+    paths: List[Tuple[Node, int]]
+    # keyed by identity, a path that is not interned is written again
+    refs: Dict[int, int]
+
+    def __init__(self: PathWriter, empty_ref: int = 0):
+        self.empty_ref = empty_ref
+        self.paths = []
+        self.refs = {id(Path.EMPTY): empty_ref}
+
+    def reference(self: PathWriter, path: Path) -> int:
+        """
+        Returns the reference of `path`, writing it and those of its tails that are not written yet.
+        """
+        refs = self.refs
+
+        # the paths that are not written yet, starting with the longest
+        unwritten = []
+        tail = path
+        while id(tail) not in refs:
+            unwritten.append(tail)
+            tail = tail.tail
+
+        for unwritten_path in reversed(unwritten):
+            self.paths.append((unwritten_path.head, refs[id(unwritten_path.tail)]))
+            refs[id(unwritten_path)] = self.empty_ref + len(self.paths)
+
+        return refs[id(path)]
+
+    def __len__(self: PathWriter):
+        return len(self.paths)
+
 class Entry:
+    """
+    An entry of a routing table, entries are immutable and may be shared between tables.
+
+    The hash covers the whole path, so entries that only differ in their paths rarely collide.
+    """
+    __slots__ = ("max_time", "parents", "expected_time", "_hash")
+
     max_time: int
-    parents: List[Node]
+    parents: Path
     expected_time: int
+    _hash: int
 
-    def __init__(self: Entry, max_time: int, parents: List[Node], expected_time: int):
+    def __init__(self: Entry, max_time: int, parents: Sequence[Node] | Path, expected_time: int):
         self.max_time = max_time
-        self.parents = parents
+        self.parents = Path.of(parents)
         self.expected_time = expected_time
+        self._hash = hash((max_time, self.parents._hash, expected_time))
 
     def parent(self: Entry) -> Node | None:
-        if 0 < len(self.parents):
-            return self.parents[0]
-        else:
-            return None
+        return self.parents.head
         
     def dominates(self: Entry, other: Entry) -> bool:
         return self.max_time <= other.max_time and self.expected_time <= other.expected_time
@@ -180,28 +495,350 @@ class Entry:
             return False
     
     def __hash__(self: Entry):
-        return hash((self.max_time, self.parent(), self.expected_time))
+        return self._hash
     
+    def __copy__(self: Entry) -> Entry:
+        return self
+
+    def __deepcopy__(self: Entry, memo: Dict) -> Entry:
+        return self
+
+    def __reduce__(self: Entry):
+        # the hash is recomputed, string hashes differ between processes
+        return (Entry, (self.max_time, self.parents, self.expected_time))
+
     def __str__(self: Entry):
         return f"Entry: {self.max_time} {self.parents} {self.expected_time}"
     
     def __repr__(self):
         return str(self)
     
+def _sort_key(entry: Entry) -> Tuple[int, int]:
+    return (entry.max_time, entry.expected_time)
+
+def _negated_expected_time(entry: Entry) -> int:
+    return -entry.expected_time
+
+class _Frontier:
+    """
+    A list of entries kept sorted by (max time, expected time).
+
+    While `pareto` holds no entry strictly dominates another one, so the expected times
+    are non-increasing along the list. Domination checks then reduce to a bisect and the
+    entries dominated by a new entry form a contiguous slice.
+
+    The `fingerprint` is the sum of the hashes of the entries, it does not depend on the order
+    the entries were added in.
+    """
+    __slots__ = ("entries", "pareto", "fingerprint")
+
+    entries: List[Entry]
+    pareto: bool
+    fingerprint: int
+
+    def __init__(self: _Frontier, entries: Set[Entry] | None = None):
+        self.entries = sorted(set(entries or ()), key=_sort_key)
+        self.fingerprint = sum(hash(entry) for entry in self.entries) & FINGERPRINT_MASK
+        self.pareto = all(_Frontier._ordered(a, b) for (a, b) in zip(self.entries, self.entries[1:]))
+
+    @staticmethod
+    def _ordered(a: Entry, b: Entry) -> bool:
+        """
+        Checks whether neighboring entries `a` and `b` can appear in this order in a Pareto frontier.
+        """
+        if a.max_time < b.max_time:
+            return a.expected_time > b.expected_time
+        return a.max_time == b.max_time and a.expected_time == b.expected_time
+
+    def _index(self: _Frontier, entry: Entry) -> int | None:
+        """
+        Returns the index of the `entry`, `None` if it is not in the frontier.
+        """
+        entries = self.entries
+        key = _sort_key(entry)
+        i = bisect_left(entries, key, key=_sort_key)
+        while i < len(entries) and entries[i].max_time == entry.max_time and entries[i].expected_time == entry.expected_time:
+            if entries[i] == entry:
+                return i
+            i += 1
+        return None
+
+    def add(self: _Frontier, entry: Entry) -> None:
+        """
+        Adds the `entry` without any domination checks, it should not be a member yet.
+        """
+        entries = self.entries
+        i = bisect_right(entries, _sort_key(entry), key=_sort_key)
+
+        if self.pareto:
+            if 0 < i and not _Frontier._ordered(entries[i - 1], entry):
+                self.pareto = False
+            elif i < len(entries) and not _Frontier._ordered(entry, entries[i]):
+                self.pareto = False
+
+        entries.insert(i, entry)
+        self.fingerprint = (self.fingerprint + hash(entry)) & FINGERPRINT_MASK
+
+    def remove(self: _Frontier, entry: Entry) -> None:
+        # removing an entry from a Pareto frontier leaves a Pareto frontier
+        del self.entries[self._index(entry)]
+        self.fingerprint = (self.fingerprint - hash(entry)) & FINGERPRINT_MASK
+
+    def insert(self: _Frontier, entry: Entry, strict: bool) -> Tuple[bool, List[Entry]]:
+        """
+        Inserts the `entry` with (strict) domination checks, requires `pareto`.
+
+        Returns whether the entry was inserted and the entries removed because of it.
+        """
+        if entry in self:
+            # inserting an entry that is already present does not change anything
+            return (False, [])
+
+        (max_time, expected_time) = key = _sort_key(entry)
+        entries = self.entries
+
+        if strict:
+            # entries with a smaller max time, the last one has the smallest expected time
+            i = bisect_left(entries, (max_time,), key=_sort_key)
+            if 0 < i and entries[i - 1].expected_time <= expected_time:
+                return (False, [])
+            if i < len(entries) and entries[i].max_time == max_time and entries[i].expected_time < expected_time:
+                return (False, [])
+
+            # equivalent entries are kept
+            start = bisect_right(entries, key, key=_sort_key)
+        else:
+            # entries with a smaller or equal max time, the last one has the smallest expected time
+            i = bisect_right(entries, (max_time, inf), key=_sort_key)
+            if 0 < i and entries[i - 1].expected_time <= expected_time:
+                return (False, [])
+
+            start = bisect_left(entries, (max_time,), key=_sort_key)
+
+        # the dominated entries are the ones following `start` with a larger or equal expected time
+        end = bisect_right(entries, -expected_time, start, key=_negated_expected_time)
+
+        removed = entries[start:end]
+        entries[start:end] = [entry]
+        self.fingerprint = (self.fingerprint + hash(entry) - sum(hash(removed_entry) for removed_entry in removed)) & FINGERPRINT_MASK
+
+        return (True, removed)
+
+    def same_members(self: _Frontier, other: _Frontier) -> bool:
+        if len(self.entries) != len(other.entries) or self.fingerprint != other.fingerprint:
+            return False
+        return set(self.entries) == set(other.entries)
+
+    def copy(self: _Frontier) -> _Frontier:
+        result = _Frontier.__new__(_Frontier)
+        result.entries = self.entries.copy()
+        result.fingerprint = self.fingerprint
+        result.pareto = self.pareto
+        return result
+
+    def __contains__(self: _Frontier, entry: Entry):
+        return self._index(entry) != None
+
+    def __iter__(self: _Frontier):
+        return iter(self.entries)
+
+    def __len__(self: _Frontier):
+        return len(self.entries)
+
 class Table:
-    entries: Set[Entry]
+    """
+    A routing table.
+
+    The entries are stored in buckets per parent node, each bucket is sorted by
+    (max time, expected time). For `insert_sd` and `insert_d` an index of all
+    entries sorted the same way is maintained in addition.
+
+    Tables are copy-on-write, `copy` shares the buckets between the tables and a
+    bucket is only copied once one of the tables modifies it.
+
+    Like the buckets, the table maintains the sum of the hashes of its entries as a fingerprint,
+    tables with different fingerprints are known to differ without comparing their entries.
+    """
+    _buckets: Dict[Node | None, _Frontier]
+    _size: int
+    _fingerprint: int
+    _frontier: _Frontier | None
+    _owns_buckets: bool
+    _owned_buckets: Set[Node | None]
+    _owns_frontier: bool
 
     def __init__(self: Table, entries: Set | None = None) -> None:
-        self.entries = entries or set()
+        self._buckets = {}
+        self._size = 0
+        self._fingerprint = 0
+        self._frontier = None
+        self._owns_buckets = True
+        self._owned_buckets = set()
+        self._owns_frontier = True
+
+        for entry in entries or ():
+            self.add(entry)
+
+    def copy(self: Table) -> Table:
+        """
+        Returns a copy of the table in constant time.
+        """
+        self._owns_buckets = False
+        self._owned_buckets = set()
+        self._owns_frontier = False
+
+        result = Table.__new__(Table)
+        result._buckets = self._buckets
+        result._size = self._size
+        result._fingerprint = self._fingerprint
+        result._frontier = self._frontier
+        result._owns_buckets = False
+        result._owned_buckets = set()
+        result._owns_frontier = False
+
+        return result
+
+    def _writable_buckets(self: Table) -> Dict[Node | None, _Frontier]:
+        if not self._owns_buckets:
+            self._buckets = self._buckets.copy()
+            self._owns_buckets = True
+
+        return self._buckets
+
+    def _writable_bucket(self: Table, parent: Node | None) -> _Frontier:
+        """
+        Returns the bucket of `parent` that this table is allowed to modify, creating it if necessary.
+        """
+        buckets = self._writable_buckets()
+
+        bucket = buckets.get(parent)
+        if bucket == None:
+            bucket = buckets[parent] = _Frontier()
+            self._owned_buckets.add(parent)
+        elif parent not in self._owned_buckets:
+            bucket = buckets[parent] = bucket.copy()
+            self._owned_buckets.add(parent)
+
+        return bucket
+
+    def _writable_frontier(self: Table) -> _Frontier | None:
+        if self._frontier != None and not self._owns_frontier:
+            self._frontier = self._frontier.copy()
+        self._owns_frontier = True
+
+        return self._frontier
+
+    def _drop_bucket_if_empty(self: Table, parent: Node | None) -> None:
+        if len(self._buckets[parent]) == 0:
+            del self._buckets[parent]
+            self._owned_buckets.discard(parent)
+
+    @property
+    def fingerprint(self: Table) -> int:
+        return self._fingerprint
+
+    @property
+    def entries(self: Table) -> FrozenSet[Entry]:
+        return frozenset(self)
+
+    def min_max_time(self: Table, condition: Callable[[Entry], bool] | None = None) -> int | float:
+        """
+        Returns the smallest max time in the table, which should not be empty.
+
+        If a `condition` is provided only the entries satisfying it are considered, if there
+        are none the result is `inf`.
+        """
+        if condition == None:
+            return min(bucket.entries[0].max_time for bucket in self._buckets.values())
+
+        result = inf
+        for bucket in self._buckets.values():
+            for entry in bucket:
+                if condition(entry):
+                    result = min(result, entry.max_time)
+                    break
+        return result
+
+    def _pareto_frontier(self: Table) -> _Frontier | None:
+        """
+        Returns the sorted index of all entries if they form a Pareto frontier.
+        """
+        if self._frontier == None:
+            self._frontier = _Frontier(self.entries)
+            self._owns_frontier = True
+
+        if self._frontier.pareto:
+            return self._writable_frontier()
+        else:
+            return None
+
+    def _bucket_add(self: Table, entry: Entry) -> None:
+        self._writable_bucket(entry.parent()).add(entry)
+        self._size += 1
+        self._fingerprint = (self._fingerprint + hash(entry)) & FINGERPRINT_MASK
+
+    def _bucket_remove(self: Table, entry: Entry) -> None:
+        parent = entry.parent()
+
+        self._writable_bucket(parent).remove(entry)
+        self._drop_bucket_if_empty(parent)
+        self._size -= 1
+        self._fingerprint = (self._fingerprint - hash(entry)) & FINGERPRINT_MASK
+
+    def add(self: Table, entry: Entry) -> None:
+        """
+        Adds the `entry` to the table without any domination checks.
+        """
+        if entry in self:
+            return
+
+        self._bucket_add(entry)
+        frontier = self._writable_frontier()
+        if frontier != None:
+            frontier.add(entry)
+
+    def discard(self: Table, entry: Entry) -> None:
+        """
+        Removes the `entry` from the table if it is present.
+        """
+        if entry not in self:
+            return
+
+        self._bucket_remove(entry)
+        frontier = self._writable_frontier()
+        if frontier != None:
+            frontier.remove(entry)
+
+    def _insert_into_frontier(self: Table, entry: Entry, strict: bool) -> bool:
+        """
+        Inserts the `entry` through the index of all entries, returns `False` if the
+        entries do not form a Pareto frontier.
+        """
+        frontier = self._pareto_frontier()
+        if frontier == None:
+            return False
+
+        (inserted, removed) = frontier.insert(entry, strict)
+
+        for removed_entry in removed:
+            self._bucket_remove(removed_entry)
+
+        if inserted:
+            self._bucket_add(entry)
+
+        return True
 
     def insert_d(self: Table, entry: Entry) -> None:
         """
         Inserts the `entry` in the `table` with domination checks.
         """
+        if self._insert_into_frontier(entry, strict=False):
+            return
+
         should_insert = True
         to_remove = []
 
-        for existing_entry in self.entries:
+        for existing_entry in self:
             if existing_entry.dominates(entry):
                 should_insert = False
                 break
@@ -209,19 +846,22 @@ class Table:
                 to_remove.append(existing_entry)
                     
         for entry_to_remove in to_remove:
-            self.entries.remove(entry_to_remove)
+            self.discard(entry_to_remove)
         
         if should_insert:
-            self.entries.add(entry)
+            self.add(entry)
 
     def insert_sd(self: Table, entry: Entry) -> None:
         """
         Inserts the `entry` in the `table` with strict dominaion checks.
         """
+        if self._insert_into_frontier(entry, strict=True):
+            return
+
         should_insert = True
         to_remove = []
 
-        for existing_entry in self.entries:
+        for existing_entry in self:
             if existing_entry.strictly_dominates(entry):
                 should_insert = False
                 break
@@ -229,10 +869,10 @@ class Table:
                 to_remove.append(existing_entry)
                     
         for entry_to_remove in to_remove:
-            self.entries.remove(entry_to_remove)
+            self.discard(entry_to_remove)
         
         if should_insert:
-            self.entries.add(entry)
+            self.add(entry)
 
     def insert_ppd(self: Table, entry: Entry) -> None:
         """
@@ -241,10 +881,37 @@ class Table:
         If `entry` is not dominated by any entries that have the same parent it gets inserted and
         all entries that have the same parent and are dominated by `entry` get removed.
         """
+        parent = entry.parent()
+
+        if parent != None and None not in self._buckets:
+            # only the bucket of the parent has to be considered, within it per parent domination 
+            # is the same as strict domination (an equivalent entry does not prevent insertion)
+            bucket = self._buckets.get(parent)
+
+            if bucket == None or bucket.pareto:
+                bucket = self._writable_bucket(parent)
+                bucket_fingerprint = bucket.fingerprint
+                (inserted, removed) = bucket.insert(entry, strict=True)
+                self._size += int(inserted) - len(removed)
+                self._fingerprint = (self._fingerprint + bucket.fingerprint - bucket_fingerprint) & FINGERPRINT_MASK
+                self._drop_bucket_if_empty(parent)
+
+                frontier = self._writable_frontier()
+                if frontier != None:
+                    for removed_entry in removed:
+                        frontier.remove(removed_entry)
+                    if inserted:
+                        frontier.add(entry)
+                return
+
+        if parent == None:
+            relevant_entries = list(self)
+        else:
+            relevant_entries = list(self._buckets.get(None, ())) + list(self._buckets.get(parent, ()))
 
         should_insert = True
         to_remove = []
-        for existing_entry in self.entries:
+        for existing_entry in relevant_entries:
             if existing_entry.parent() != None and entry.parent() != None and existing_entry.parent() != entry.parent():
                 # only consider domination if existing entry has the same parent as entry
                 continue
@@ -260,44 +927,83 @@ class Table:
                 to_remove.append(existing_entry)
 
         for entry_to_remove in to_remove:
-            self.entries.remove(entry_to_remove)
+            self.discard(entry_to_remove)
         
         if should_insert:
-            self.entries.add(entry)
+            self.add(entry)
 
     def remove_all_entries_with_parent(self: Table, parent: Node):
-        to_remove = []
-        for entry in self.entries:
-            if entry.parent() == parent:
-                to_remove.append(entry)
+        if parent not in self._buckets:
+            return
 
-        for entry_to_remove in to_remove:
-            self.entries.remove(entry_to_remove)
+        bucket = self._writable_buckets().pop(parent)
+        self._owned_buckets.discard(parent)
+
+        self._size -= len(bucket)
+        self._fingerprint = (self._fingerprint - bucket.fingerprint) & FINGERPRINT_MASK
+        frontier = self._writable_frontier()
+        if frontier != None:
+            for entry in bucket:
+                frontier.remove(entry)
+
+    def entry_with_parents(self: Table, parents: Path) -> Entry | None:
+        """
+        Returns an entry of the table whose parents are `parents`, if there is one.
+        """
+        bucket = self._buckets.get(parents.head)
+        if bucket == None:
+            return None
+
+        for entry in bucket:
+            if entry.parents == parents:
+                return entry
+        return None
 
     def remove_all_entries_with_n_parents(self: Table, n: int):
         to_remove = []
-        for entry in self.entries:
+        for entry in self:
             if len(entry.parents) == n:
                 to_remove.append(entry)
 
         for entry_to_remove in to_remove:
-            self.entries.remove(entry_to_remove)
+            self.discard(entry_to_remove)
+
+    def __contains__(self: Table, entry: object):
+        if type(entry) != Entry:
+            return False
+
+        bucket = self._buckets.get(entry.parent())
+        return bucket != None and entry in bucket
 
     def __iter__(self: Table):
-        return iter(self.entries)
+        for bucket in self._buckets.values():
+            yield from bucket
 
     def __len__(self: Table):
-        return len(self.entries)
+        return self._size
 
     def __str__(self: Table):
-        return str(self.entries)
+        if self._size == 0:
+            return "set()"
+        return "{" + ", ".join(repr(entry) for entry in self) + "}"
     
     def __repr__(self: Table):
         return str(self)
     
     def __eq__(self: Table, other: object):
         if type(other) == Table:
-            return self.entries == other.entries
+            if len(self) != len(other) or self._fingerprint != other._fingerprint:
+                return False
+            if self._buckets.keys() != other._buckets.keys():
+                return False
+
+            for (parent, bucket) in self._buckets.items():
+                other_bucket = other._buckets[parent]
+                # buckets shared by copies of a table are the same object
+                if bucket is not other_bucket and not bucket.same_members(other_bucket):
+                    return False
+
+            return True
         else:
             return False
     
@@ -306,16 +1012,56 @@ class TableDiff:
     added: Set[Entry]
 
     def __init__(self, old_table: Table, new_table: Table) -> None:
-        self.removed = old_table.entries - new_table.entries
-        self.added = new_table.entries - old_table.entries
+        """
+        Computes the changes from the `old_table` to the `new_table`, buckets that are shared
+        or have the same members are skipped.
+        """
+        self.removed = set()
+        self.added = set()
+
+        if old_table == new_table:
+            return
+
+        for (parent, old_bucket) in old_table._buckets.items():
+            new_bucket = new_table._buckets.get(parent)
+            if new_bucket == None:
+                self.removed.update(old_bucket)
+            elif new_bucket is not old_bucket and not old_bucket.same_members(new_bucket):
+                (old_members, new_members) = (set(old_bucket), set(new_bucket))
+                self.removed.update(old_members - new_members)
+                self.added.update(new_members - old_members)
+
+        for (parent, new_bucket) in new_table._buckets.items():
+            if parent not in old_table._buckets:
+                self.added.update(new_bucket)
 
-    def apply(self: TableDiff, table: Table):
+    @staticmethod
+    def from_changes(removed: Set[Entry], added: Set[Entry]) -> TableDiff:
+        result = TableDiff.__new__(TableDiff)
+        result.removed = removed
+        result.added = added
+        return result
+
+    def followed_by(self: TableDiff, other: TableDiff) -> TableDiff:
+        """
+        Returns a diff equivalent to applying this diff and then the `other` diff.
+        """
+        added = (self.added - other.removed) | other.added
+        removed = (self.removed | other.removed) - added
+        return TableDiff.from_changes(removed, added)
+
+    def apply(self: TableDiff, table: Table, condition: Callable[[Entry], bool] | None = None):
+        """
+        Applies the changes to the `table`, if a `condition` is provided only the entries 
+        satisfying it are applied.
+        """
         for removed_entry in self.removed:
-            if removed_entry in table.entries:
-                table.entries.remove(removed_entry)
+            if condition == None or condition(removed_entry):
+                table.discard(removed_entry)
         
         for added_entry in self.added:
-            table.entries.add(added_entry)
+            if condition == None or condition(added_entry):
+                table.add(added_entry)
 
     
     def __len__(self):
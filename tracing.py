@@ -0,0 +1,90 @@
+from __future__ import annotations
+from collections import deque
+from enum import IntEnum
+from typing import Deque, Iterator, List, TextIO, Tuple
+from structures import Node
+
+class TraceLevel(IntEnum):
+    OFF = 0
+    # messages sent between routers
+    INFO = 1
+    # evaluation of every incoming edge of a router, including the tables involved
+    DEBUG = 2
+
+class TraceEvent:
+    level: TraceLevel
+    component: str
+    node: Node | None
+    message: str
+    args: Tuple
+
+    def __init__(self: TraceEvent, level: TraceLevel, component: str, node: Node | None, message: str, args: Tuple):
+        self.level = level
+        self.component = component
+        self.node = node
+        self.message = message
+        self.args = args
+
+    def __str__(self: TraceEvent):
+        if self.node == None:
+            prefix = f"[{self.component}]"
+        else:
+            prefix = f"[{self.component} {self.node}]"
+
+        return f"{prefix} {self.message.format(*self.args)}"
+
+    def __repr__(self: TraceEvent):
+        return str(self)
+
+class Tracer:
+    """
+    Collects trace events of a `System`.
+
+    Events are stored with the objects they refer to and only formatted when they are read
+    or written to the `stream`. Callers check `level` before creating an event, so a tracer
+    with level `OFF` (the default) costs a single comparison per trace point.
+
+    If `capacity` is provided only the last `capacity` events are kept, with `capacity=0` no events
+    are kept. A tracer writing to a `stream` keeps no events unless a `capacity` is provided.
+    Events keep references to the objects they were created with, so these should not be modified
+    afterwards.
+    """
+    level: TraceLevel
+    events: Deque[TraceEvent]
+    stream: TextIO | None
+
+    def __init__(self: Tracer, level: TraceLevel = TraceLevel.OFF, capacity: int | None = None, stream: TextIO | None = None):
+        if capacity == None and stream != None:
+            capacity = 0
+
+        self.level = level
+        self.events = deque(maxlen=capacity)
+        self.stream = stream
+
+    def enabled(self: Tracer, level: TraceLevel) -> bool:
+        return level <= self.level
+
+    def trace(self: Tracer, level: TraceLevel, component: str, node: Node | None, message: str, *args) -> None:
+        """
+        Records an event, `message` is a format string that is formatted with `args` on demand.
+        """
+        if self.level < level:
+            return
+
+        event = TraceEvent(level, component, node, message, args)
+        self.events.append(event)
+
+        if self.stream != None:
+            self.stream.write(f"{event}\n")
+
+    def lines(self: Tracer) -> List[str]:
+        return [str(event) for event in self.events]
+
+    def clear(self: Tracer) -> None:
+        self.events.clear()
+
+    def __iter__(self: Tracer) -> Iterator[TraceEvent]:
+        return iter(self.events)
+
+    def __len__(self: Tracer):
+        return len(self.events)
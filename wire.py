@@ -0,0 +1,142 @@
+from __future__ import annotations
+from structures import Entry, Node, NodeInterner, Path, PathWriter, Table, TableDiff
+from typing import Tuple
+
+NODE_INT = 0
+NODE_STR = 1
+
+def write_varint(buffer: bytearray, value: int):
+    """
+    Appends the non-negative `value` in 7 bit groups, least significant first.
+    """
+    while 0x80 <= value:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """
+    Reads a varint at `offset`, returns the value and the offset following it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return (value, offset)
+        shift += 7
+
+def write_signed_varint(buffer: bytearray, value: int):
+    # zigzag encoding, small negative values stay small
+    write_varint(buffer, value * 2 if 0 <= value else -value * 2 - 1)
+
+def read_signed_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    (value, offset) = read_varint(data, offset)
+    return (value // 2 if value % 2 == 0 else -(value + 1) // 2, offset)
+
+def write_node(buffer: bytearray, node: Node):
+    if type(node) == int:
+        buffer.append(NODE_INT)
+        write_signed_varint(buffer, node)
+    else:
+        encoded = node.encode()
+        buffer.append(NODE_STR)
+        write_varint(buffer, len(encoded))
+        buffer += encoded
+
+def read_node(data: bytes, offset: int) -> Tuple[Node, int]:
+    kind = data[offset]
+    if kind == NODE_INT:
+        return read_signed_varint(data, offset + 1)
+
+    (length, offset) = read_varint(data, offset + 1)
+    return (data[offset:offset + length].decode(), offset + length)
+
+def encode_diff(diff: TableDiff) -> bytes:
+    """
+    Encodes the `diff` compactly.
+
+    Every node is written once and referred to by its index. Paths are written as (head, tail)
+    pairs where the tail refers to an earlier path (or the empty path), so paths with a common
+    suffix share it. Added entries are sorted by max time, times are written as differences to
+    the previous entry. Removed entries are written as their paths only, the receiver looks them
+    up in its table (see `decode_diff`), which has at most one entry per path.
+    """
+    # path reference 0 is the empty path, reference `i + 1` the `i`th path written
+    paths = PathWriter()
+
+    added = sorted(diff.added, key=lambda entry: (entry.max_time, entry.expected_time))
+    added_refs = [paths.reference(entry.parents) for entry in added]
+    removed_refs = sorted(set(paths.reference(entry.parents) for entry in diff.removed))
+
+    nodes = NodeInterner(head for (head, _) in paths.paths)
+
+    buffer = bytearray()
+    write_varint(buffer, len(nodes))
+    for node in nodes.labels:
+        write_node(buffer, node)
+
+    write_varint(buffer, len(paths))
+    for (head, tail) in paths.paths:
+        write_varint(buffer, nodes.id(head))
+        write_varint(buffer, tail)
+
+    write_varint(buffer, len(added))
+    (max_time, expected_time) = (0, 0)
+    for (entry, ref) in zip(added, added_refs):
+        write_varint(buffer, ref)
+        write_signed_varint(buffer, entry.max_time - max_time)
+        write_signed_varint(buffer, entry.expected_time - expected_time)
+        (max_time, expected_time) = (entry.max_time, entry.expected_time)
+
+    write_varint(buffer, len(removed_refs))
+    previous = 0
+    for ref in removed_refs:
+        write_varint(buffer, ref - previous)
+        previous = ref
+
+    return bytes(buffer)
+
+def decode_diff(data: bytes, table: Table, offset: int = 0) -> TableDiff:
+    """
+    Decodes a diff written by `encode_diff`, the removed entries are resolved in the `table`
+    the diff is going to be applied to. Removed paths without an entry in the table are skipped,
+    removing them would not change the table.
+    """
+    (num_nodes, offset) = read_varint(data, offset)
+    nodes = []
+    for _ in range(num_nodes):
+        (node, offset) = read_node(data, offset)
+        nodes.append(node)
+
+    (num_paths, offset) = read_varint(data, offset)
+    paths = [Path.EMPTY]
+    for _ in range(num_paths):
+        (head, offset) = read_varint(data, offset)
+        (tail, offset) = read_varint(data, offset)
+        paths.append(paths[tail].prepend(nodes[head]))
+
+    added = set()
+    (num_added, offset) = read_varint(data, offset)
+    (max_time, expected_time) = (0, 0)
+    for _ in range(num_added):
+        (ref, offset) = read_varint(data, offset)
+        (max_time_delta, offset) = read_signed_varint(data, offset)
+        (expected_time_delta, offset) = read_signed_varint(data, offset)
+        max_time += max_time_delta
+        expected_time += expected_time_delta
+        added.add(Entry(max_time, paths[ref], expected_time))
+
+    removed = set()
+    (num_removed, offset) = read_varint(data, offset)
+    ref = 0
+    for _ in range(num_removed):
+        (ref_delta, offset) = read_varint(data, offset)
+        ref += ref_delta
+        entry = table.entry_with_parents(paths[ref])
+        if entry != None:
+            removed.add(entry)
+
+    return TableDiff.from_changes(removed, added)